@@ -0,0 +1,211 @@
+import os
+import glob
+import time
+import shutil
+import hashlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from src.pdf.pdf import Pdf
+from src.config import global_config
+from src.service.download_service import is_url, try_download, get_arxiv_pdf_url, get_filename_from_url
+from src.service.document_translator import DocumentTranslator
+from src.service.request_scheduler import RequestScheduler
+
+def collect_sources(inputs):
+    """Expands directories and glob patterns into PDF files, URLs are kept as they are."""
+    sources = []
+    for item in inputs:
+        if is_url(item):
+            sources.append(item)
+        elif os.path.isdir(item):
+            sources.extend(sorted(glob.glob(os.path.join(item, "*.pdf"))))
+        elif glob.has_magic(item):
+            sources.extend(sorted(glob.glob(item, recursive=True)))
+        elif os.path.isfile(item):
+            sources.append(item)
+        else:
+            print(f"Skipping '{item}', it is not a file, a directory, a glob pattern or an URL")
+
+    # the same document given twice would be converted concurrently into the same files
+    unique = []
+    seen = set()
+    downloads = {}
+    for source in sources:
+        key = source_key(source)
+        if key in seen:
+            continue
+
+        if is_url(source):
+            # different URLs with the same file name would be downloaded into the same cache file
+            download = get_filename_from_url(key)
+            if download in downloads:
+                print(f"Skipping '{source}', it downloads to the same file as '{downloads[download]}'")
+                continue
+            downloads[download] = source
+
+        seen.add(key)
+        unique.append(source)
+    return unique
+
+def source_key(source):
+    """Identifies a document: the absolute path of a file, or the URL it is downloaded from."""
+    if is_url(source):
+        return get_arxiv_pdf_url(source) or source
+    return os.path.abspath(source)
+
+def export_names(sources):
+    """Names the exported text of each source after its PDF, with a hash suffix where names collide."""
+    stems = {}
+    for source in sources:
+        key = source_key(source)
+        name = get_filename_from_url(key) if is_url(source) else os.path.basename(key)
+        stems[source] = os.path.splitext(name)[0] or "document"
+
+    counts = Counter(stems.values())
+    names = {}
+    for source, stem in stems.items():
+        if counts[stem] > 1:
+            # e.g. dir1/paper.pdf and dir2/paper.pdf, the suffix keeps the name stable between runs
+            stem += "." + hashlib.sha1(source_key(source).encode("utf-8")).hexdigest()[:8]
+        names[source] = stem + ".txt"
+    return names
+
+def download_sources(sources, intm_dir, workers):
+    """Downloads the URL sources into intm_dir. Returns the local path of every source, None where the download failed."""
+    paths = { source: source for source in sources if not is_url(source) }
+    urls = [source for source in sources if is_url(source)]
+    if urls:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            paths.update(zip(urls, executor.map(lambda url: try_download(url, intm_dir), urls)))
+    return paths
+
+def group_by_content(sources, paths):
+    """Groups sources by their context cache key, in order of first appearance.
+
+    Identical PDFs share one cache entry, journal and page store, so each group is converted once
+    by a single process and its export copied to the other names.
+    """
+    groups = {}
+    for source in sources:
+        try:
+            key = Pdf.cache_key(paths[source])
+        except OSError:
+            # unreadable, converting it reports the error
+            key = source
+        groups.setdefault(key, []).append(source)
+    return list(groups.values())
+
+def copy_export(result, source, pathname):
+    """The result of a source with the same content as an already converted one."""
+    _, exported, pages, _, error = result
+    if error is not None:
+        return source, None, 0, 0, error
+    try:
+        shutil.copyfile(exported, pathname + ".tmp")
+        os.replace(pathname + ".tmp", pathname)
+        return source, pathname, pages, 0, None
+    except OSError as e:
+        return source, None, 0, 0, str(e)
+
+def export_text(pdf, pathname):
+    with open(pathname + ".tmp", 'w', encoding='utf-8') as file:
+        for text in pdf.iter_text():
+            file.write(text)
+    os.replace(pathname + ".tmp", pathname)
+
+def share_rate_limits(workers):
+    # every worker process has its own schedulers, together they must stay within the provider's limits
+    RequestScheduler.share = 1 / workers
+
+def translate_document(pdf):
+    def on_result(key, text):
+        if text is not None:
+            pdf.set_translation(key, text)
+
+    translator = DocumentTranslator(pdf)
+    translator.run(translator.collect_targets(), on_result)
+    pdf.save()
+
+def convert_document(source, path_name, export_name, intm_dir, export_dir, ignore_cache = False, extract_workers = 1, translate = False):
+    """Extracts, chains, optionally translates and exports a single document. Returns (source, exported path, page count, seconds, error)."""
+    start = time.perf_counter()
+    try:
+        pdf = Pdf(path_name, intm_dir, ignore_cache, extract_workers)
+        if translate:
+            translate_document(pdf)
+
+        pathname = os.path.join(export_dir, export_name)
+        export_text(pdf, pathname)
+
+        return source, pathname, pdf.get_page_number(), time.perf_counter() - start, None
+
+    except SystemExit:
+        # Pdf exits the process when the PDF cannot be loaded, which must not take the whole batch down
+        return source, None, 0, time.perf_counter() - start, "loading PDF failed"
+
+    except Exception as e:
+        return source, None, 0, time.perf_counter() - start, str(e) or type(e).__name__
+
+def run_batch(inputs, intm_dir, export_dir, workers = None, ignore_cache = False, translate = False):
+    sources = collect_sources(inputs)
+    if len(sources) == 0:
+        print("No input documents found")
+        return []
+
+    if workers is None:
+        workers = global_config.BATCH_WORKERS
+    names = export_names(sources)
+
+    start = time.perf_counter()
+    results = []
+
+    def report(result):
+        source, pathname, pages, seconds, error = result
+        results.append(result)
+        if error is None:
+            print(f"[{len(results)}/{len(sources)}] {source}: {pages} pages in {seconds:.1f}s -> {pathname}")
+        else:
+            print(f"[{len(results)}/{len(sources)}] {source}: failed after {seconds:.1f}s ({error})")
+
+    def report_group(result, group):
+        report(result)
+        for duplicate in group[1:]:
+            report(copy_export(result, duplicate, os.path.join(export_dir, names[duplicate])))
+
+    # downloaded first, the content of every document must be known before they are grouped
+    paths = download_sources(sources, intm_dir, max(1, workers))
+    for source in sources:
+        if paths[source] is None:
+            report((source, None, 0, 0, "download failed"))
+    groups = group_by_content([source for source in sources if paths[source] is not None], paths)
+
+    workers = max(1, min(workers, len(groups)))
+    print(f"Converting {len(groups)} documents with {workers} worker processes")
+
+    def convert_args(group):
+        return group[0], paths[group[0]], names[group[0]], intm_dir, export_dir, ignore_cache
+
+    if workers == 1:
+        # a single document at a time can use the parallel layout extraction instead
+        for group in groups:
+            report_group(convert_document(*convert_args(group), None, translate), group)
+    else:
+        initializer, initargs = (share_rate_limits, (workers,)) if translate else (None, ())
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+            futures = { executor.submit(convert_document, *convert_args(group), 1, translate): group for group in groups }
+            for future in as_completed(futures):
+                report_group(future.result(), futures[future])
+
+    elapsed = time.perf_counter() - start
+    succeeded = [r for r in results if r[4] is None]
+    pages = sum(r[2] for r in succeeded)
+
+    print()
+    print(f"Converted {len(succeeded)} of {len(results)} documents, {pages} pages in {elapsed:.1f}s")
+    if len(succeeded) > 0:
+        print(f"Average {sum(r[3] for r in succeeded) / len(succeeded):.1f}s per document, {pages / max(elapsed, 1e-9):.1f} pages/s overall")
+    for source, _, _, _, error in results:
+        if error is not None:
+            print(f"Failed: {source} ({error})")
+
+    return results
@@ -0,0 +1,78 @@
+import queue
+import itertools
+import threading
+
+class PageRenderer:
+    """Renders pages at the size they are shown on a background thread.
+
+    A request first gets a quick preview, then the exact render; both are handed to on_ready(page_number, extent, image, sharp)
+    on the Tk thread. A newer request makes the pending ones stale, so only the page last asked for is rendered.
+    Prefetched pages get only the exact render, after every shown page, and a newer prefetch makes the pending ones stale.
+    """
+    PRIORITY_SHOWN = 0
+    PRIORITY_PREFETCH = 1
+
+    def __init__(self, widget, pdf):
+        self.widget = widget
+        self.pdf = pdf
+        self.generation = 0
+        self.prefetch_generation = 0
+        self.latest = None
+        self.latest_prefetch = None
+        self.sequence = itertools.count()
+        self.jobs = queue.PriorityQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, page_number, extent, on_ready):
+        # redraws while the page is still rendering do not start it over
+        if self.latest == (page_number, extent):
+            return
+        self.latest = (page_number, extent)
+        self.generation += 1
+        self.jobs.put((PageRenderer.PRIORITY_SHOWN, next(self.sequence), self.generation, page_number, extent, on_ready))
+
+    def prefetch(self, pages, on_ready):
+        """Renders (page, extent) pairs ahead of time, in order; cancels what an earlier prefetch left pending."""
+        if self.latest_prefetch == pages:
+            return
+        self.latest_prefetch = pages
+        self.prefetch_generation += 1
+        for page_number, extent in pages:
+            self.jobs.put((PageRenderer.PRIORITY_PREFETCH, next(self.sequence), self.prefetch_generation, page_number, extent, on_ready))
+
+    def is_current(self, priority, generation):
+        if priority == PageRenderer.PRIORITY_SHOWN:
+            return generation == self.generation
+        return generation == self.prefetch_generation
+
+    def post(self, on_ready, page_number, extent, image, sharp):
+        try:
+            self.widget.after(0, on_ready, page_number, extent, image, sharp)
+        except RuntimeError:
+            # the main loop is gone, the application is closing
+            pass
+
+    def run(self):
+        while True:
+            priority, _, generation, page_number, extent, on_ready = self.jobs.get()
+            if not self.is_current(priority, generation):
+                continue
+
+            try:
+                if priority == PageRenderer.PRIORITY_SHOWN:
+                    preview = self.pdf.get_page_preview(page_number, extent)
+                    if not self.is_current(priority, generation):
+                        continue
+                    self.post(on_ready, page_number, extent, preview, False)
+
+                image = self.pdf.render_page(page_number, extent)
+            except Exception as e:
+                print(f"Rendering page {page_number + 1} failed")
+                print(e)
+                if priority == PageRenderer.PRIORITY_SHOWN:
+                    self.latest = None
+                continue
+            self.post(on_ready, page_number, extent, image, True)
+            if priority == PageRenderer.PRIORITY_SHOWN and self.is_current(priority, generation):
+                self.latest = None
@@ -1,12 +1,16 @@
 import tkinter as tk
-from PIL import Image, ImageTk
 from src.pdf.pdf import PdfRect
 from src.toolbar.pdf_viewer_toolbar_item import PdfViewerToolbarItem
 from src.canvas.pdf_element_manager import PdfElementManager
 from src.canvas.draggable_rectangle import DraggableRectangle
-from src.canvas.utility import get_image_extent
+from src.canvas.page_renderer import PageRenderer
+from src.canvas.render_cache import RenderCache
+from src.canvas.utility import get_fit_extent
 
 class PdfCanvas(tk.Canvas):
+    # milliseconds without a further <Configure> before a resized canvas is redrawn
+    RESIZE_DELAY = 100
+
     def __init__(self, master=None, pdf=None, **kwargs):
         super().__init__(master, **kwargs)
         self.pdf = pdf
@@ -29,12 +33,19 @@ class PdfCanvas(tk.Canvas):
         self.bind("<<SafeAreaDragEnd>>", self.on_safe_area_drag_end)
 
         self.current_page = 0
+        self.scroll_direction = 0
         self.elm = PdfElementManager(self)
 
         self.mode = None
         self.drag_enabled = False
         self.pivot = None
 
+        self.render_cache = RenderCache()
+        self.renderer = PageRenderer(self, self.pdf)
+        self.page_image = None
+        self.resize_job = None
+        self.drawn_size = None
+
     def get_pivot(self):
         return self.pivot
     
@@ -43,6 +54,9 @@ class PdfCanvas(tk.Canvas):
 
     def change_page(self, new_page_number):
         if new_page_number >= 0 and new_page_number < self.pdf.get_page_number():
+            # a jump elsewhere has no direction to prefetch in
+            step = new_page_number - self.current_page
+            self.scroll_direction = step if abs(step) == 1 else 0
             self.current_page = new_page_number
             self.pivot = None
             self.redraw()
@@ -61,9 +75,14 @@ class PdfCanvas(tk.Canvas):
         self.redraw()
    
     def redraw(self):
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+            self.resize_job = None
+        self.drawn_size = (self.winfo_width(), self.winfo_height())
+
         self.clear()
         self.show_page(
-            self.pdf.get_pixmap(self.current_page),
+            self.current_page,
             self.pdf.get_page_extent(self.current_page), 
             self.pdf.get_safe_margin(),
             self.pdf.iter_elements_page(self.current_page))
@@ -75,23 +94,25 @@ class PdfCanvas(tk.Canvas):
         self.delete('all')  # delete all canvas items
         self.elm.clear()
         self.photoimg = None
+        self.page_image = None
 
-    def show_page(self, pix, page_extent, safe_margin, elements):
+    def show_page(self, page_number, page_extent, safe_margin, elements):
         page_width, page_height = page_extent
 
-        # Convert the PyMuPDF page to PIL Image and resize to fit window
-
-        #img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        img = pix.copy()
-        img = img.resize((get_image_extent(self, pix)), Image.LANCZOS)
-
-        # Convert the PIL Image to PhotoImage and show it on the Canvas
-        self.photoimg = ImageTk.PhotoImage(img)
-        self.create_image(0, 0, image=self.photoimg, anchor='nw')
+        # The page is rendered at the size it is shown, off the Tk thread; overlay-only redraws reuse the render
+        img_width, img_height = extent = get_fit_extent(self, page_width, page_height)
+        self.page_extent = extent
+        entry = self.render_cache.get(page_number, extent)
+        if entry is not None:
+            self.photoimg = entry[0]
+        if entry is None or not entry[1]:
+            self.renderer.request(page_number, extent, self.on_page_rendered)
+        self.prefetch_neighbours(page_number)
+        self.page_image = self.create_image(0, 0, image=self.photoimg if self.photoimg is not None else "", anchor='nw')
 
         # Draw the pdfminer layout on the PIL Image
-        self.scale_factor_x = img.width / page_width
-        self.scale_factor_y = img.height / page_height
+        self.scale_factor_x = img_width / page_width
+        self.scale_factor_y = img_height / page_height
 
         #for element in pdfminer_page:
         index = 1
@@ -103,7 +124,7 @@ class PdfCanvas(tk.Canvas):
             x1, x2 = sorted([x1 * self.scale_factor_x, x2 * self.scale_factor_x])
             x2 = max(x2, x1 + 1)  # Ensure x2 is always greater than x1
 
-            y1, y2 = sorted([img.height - y1 * self.scale_factor_y, img.height - y2 * self.scale_factor_y])
+            y1, y2 = sorted([img_height - y1 * self.scale_factor_y, img_height - y2 * self.scale_factor_y])
             y2 = max(y2, y1 + 1)  # Ensure y2 is always greater than y1
 
             # Create the rectangle and save the handle
@@ -159,6 +180,28 @@ class PdfCanvas(tk.Canvas):
         else:
             self.create_rectangle(safe_x1, safe_y1, safe_x2, safe_y2, outline="gray40", dash=(5, 3))
 
+    def prefetch_neighbours(self, page_number):
+        # two pages ahead in the scroll direction and one behind; both neighbours after a jump
+        if self.scroll_direction == 0:
+            candidates = [page_number + 1, page_number - 1]
+        else:
+            step = self.scroll_direction
+            candidates = [page_number + step, page_number + 2 * step, page_number - step]
+
+        pages = []
+        for candidate in candidates:
+            if 0 <= candidate < self.pdf.get_page_number():
+                extent = get_fit_extent(self, *self.pdf.get_page_extent(candidate))
+                if not self.render_cache.is_sharp(candidate, extent):
+                    pages.append((candidate, extent))
+        self.renderer.prefetch(pages, self.on_page_rendered)
+
+    def on_page_rendered(self, page_number, extent, image, sharp):
+        entry = self.render_cache.put(page_number, extent, image, sharp)
+        if self.page_image is not None and page_number == self.current_page and extent == self.page_extent:
+            self.photoimg = entry[0]
+            self.itemconfig(self.page_image, image=self.photoimg)
+
     def on_mouse_wheel(self, event):
         """Handle mouse wheel scrolling."""
         if event.delta > 0:
@@ -173,7 +216,12 @@ class PdfCanvas(tk.Canvas):
         self.change_page(self.current_page + 1)
 
     def on_resize(self, event):
-        self.redraw()
+        # the window sends a <Configure> for every intermediate size while it is dragged, only the last one is drawn
+        if (event.width, event.height) == self.drawn_size:
+            return
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(PdfCanvas.RESIZE_DELAY, self.redraw)
 
     def on_drag_start(self, event):
         """Begining drag of an object"""
@@ -1,28 +1,48 @@
+from collections import OrderedDict
 from PIL import Image, ImageTk
 from src.canvas.element_setting import get_setting
-from src.canvas.utility import check_overlap
+from src.canvas.spatial_grid import SpatialGrid
 
 class PdfElementManager:
+    # overlay bitmaps kept for reuse across elements and redraws, by (width, height, colour)
+    BITMAP_CACHE_SIZE = 64
+
     def __init__(self, canvas):
         self.canvas = canvas
         self.elements = []
         self.selected_elements = []
 
-    def add(self, key, rectangle, image_id, image):
-        self.elements.append((key, rectangle, image_id, image))
+        # element boxes in drawing order, hover and drag only look at the elements around the pointer
+        self.grid = SpatialGrid()
+        self.keys = {}
+
+        # highlight overlays are created when an element is first highlighted, key -> (image id, bitmap)
+        self.overlays = {}
+        self.shown = set()
+        self.bitmaps = OrderedDict()
+
+    def add(self, key, rectangle, fill, bbox):
+        self.keys[key] = self.grid.add(bbox)
+        self.elements.append((key, rectangle, fill, bbox))
 
     def clear(self):
         self.elements = []
         self.selected_elements = []
+        self.grid.clear()
+        self.keys = {}
+        self.overlays = {}
+        self.shown = set()
 
     def get_selected(self):
         return self.selected_elements
 
     def find_by_key(self, key):
-        return next((element for element in self.elements if element[0] == key), None)
+        index = self.keys.get(key)
+        return self.elements[index] if index is not None else None
 
     def find_by_point(self, x, y):
-        return next((element for element in self.elements if self.is_inside_rectangle(x, y, element[1])), None)
+        found = self.grid.query_point(x, y)
+        return self.elements[found[0]] if found else None
 
     def add_element(self, mode, key, index, safe, visible, can_be_split, x1, y1, x2, y2, c1, c2):
         settings = get_setting(mode, safe, visible, can_be_split)
@@ -31,14 +51,6 @@ class PdfElementManager:
         dash = settings.get('dash')
         width = settings.get('width')
 
-        alpha = int(0.25 * 255)
-        img_fill = self.canvas.winfo_rgb(fill) + (alpha,)
-        
-        image = Image.new('RGBA', (int(x2-x1), int(y2-y1)), img_fill)
-        image = ImageTk.PhotoImage(image)
-        image_id = self.canvas.create_image(x1, y1, image=image, anchor='nw')
-        self.canvas.itemconfig(image_id, state='hidden')  # initially hide the image
-
         # create rectangle
         kwargs = { 'outline': outline, 'width': width }
         if dash is not None:
@@ -61,33 +73,65 @@ class PdfElementManager:
                 text_bg = self.canvas.create_rectangle(self.canvas.bbox(text_id), fill=fill)
                 self.canvas.tag_lower(text_bg, text_id)
 
-        self.elements.append((key, rectangle, image_id, image))
+        self.add(key, rectangle, fill, (x1, y1, x2, y2))
         return rectangle
 
-    def is_inside_rectangle(self, x, y, rectangle):
-        """Check if the point (x, y) is inside the given rectangle."""
-        x1, y1, x2, y2 = self.canvas.coords(rectangle)
-        return x1 <= x <= x2 and y1 <= y <= y2
+    def get_bitmap(self, width, height, fill):
+        bitmap_key = (width, height, fill)
+        bitmap = self.bitmaps.get(bitmap_key)
+        if bitmap is not None:
+            self.bitmaps.move_to_end(bitmap_key)
+            return bitmap
+
+        alpha = int(0.25 * 255)
+        img_fill = self.canvas.winfo_rgb(fill) + (alpha,)
+
+        bitmap = ImageTk.PhotoImage(Image.new('RGBA', (width, height), img_fill))
+        self.bitmaps[bitmap_key] = bitmap
+        # overlays hold their own reference, so an evicted bitmap stays valid while it is shown
+        while len(self.bitmaps) > PdfElementManager.BITMAP_CACHE_SIZE:
+            self.bitmaps.popitem(last=False)
+        return bitmap
+
+    def show_overlay(self, element):
+        key, rectangle, fill, bbox = element
+        if key in self.shown:
+            return
+        self.shown.add(key)
+
+        overlay = self.overlays.get(key)
+        if overlay is not None:
+            self.canvas.itemconfig(overlay[0], state='normal')  # show image
+            return
+
+        x1, y1, x2, y2 = bbox
+        bitmap = self.get_bitmap(int(x2-x1), int(y2-y1), fill)
+        image_id = self.canvas.create_image(x1, y1, image=bitmap, anchor='nw')
+        # right below its rectangle, as if it had been drawn with the element
+        self.canvas.tag_lower(image_id, rectangle)
+        self.overlays[key] = (image_id, bitmap)
+
+    def hide_overlay(self, key):
+        if key not in self.shown:
+            return
+        self.shown.discard(key)
+        self.canvas.itemconfig(self.overlays[key][0], state='hidden')  # hide image
+
+    def show_only(self, indices):
+        """Shows the overlays of the given elements and hides the others, touching only the ones that change."""
+        keys = set(self.elements[index][0] for index in indices)
+        for key in self.shown - keys:
+            self.hide_overlay(key)
+        for index in indices:
+            self.show_overlay(self.elements[index])
 
     def update_hover(self, x, y):
-        for _, rectangle, image_id, _ in self.elements:
-            if self.is_inside_rectangle(x, y, rectangle):
-                self.canvas.itemconfig(image_id, state='normal')  # show image
-            else:
-                self.canvas.itemconfig(image_id, state='hidden')  # hide image
+        self.show_only(self.grid.query_point(x, y))
 
     def update_drag(self, drag_id):
-        self.selected_elements = []
-
         if drag_id is not None:
-            drag_rect = self.canvas.coords(drag_id)
-            for key, rectangle, image_id, _ in self.elements:
-                element_rect = self.canvas.coords(rectangle)
-                if check_overlap(drag_rect, element_rect):
-                    self.canvas.itemconfig(image_id, state='normal')  # show image
-                    self.selected_elements.append(key)
-                else:
-                    self.canvas.itemconfig(image_id, state='hidden')  # hide image
+            found = self.grid.query_rect(*self.canvas.coords(drag_id))
         else:
-            for _, rectangle, image_id, _ in self.elements:
-                self.canvas.itemconfig(image_id, state='hidden')  # hide image
+            found = []
+        self.selected_elements = [self.elements[index][0] for index in found]
+        self.show_only(found)
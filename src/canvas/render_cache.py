@@ -0,0 +1,42 @@
+from collections import OrderedDict
+from PIL import ImageTk
+
+class RenderCache:
+    """Page images rendered for the canvas, with their PhotoImages, by (page, width, height).
+
+    Redraws that only change the overlays, and going back to a recently shown page, reuse the
+    bitmap instead of rendering the page again. The least recently used entries are dropped.
+    An entry is either a preview or the sharp render that replaces it.
+    """
+    def __init__(self, capacity = 8):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, page_number, extent):
+        """Returns (photo image, sharp) of the page at extent, or None when it has not been rendered yet."""
+        key = (page_number,) + tuple(extent)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def is_sharp(self, page_number, extent):
+        entry = self.entries.get((page_number,) + tuple(extent))
+        return entry is not None and entry[1]
+
+    def put(self, page_number, extent, image, sharp):
+        key = (page_number,) + tuple(extent)
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] and not sharp:
+            # a late preview never replaces the sharp render
+            return entry
+
+        entry = (ImageTk.PhotoImage(image), sharp)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,53 @@
+class SpatialGrid:
+    """Uniform grid over item bounding boxes, for point and rectangle queries without scanning every item.
+
+    Items are numbered in the order they are added, and queries return the numbers in that order.
+    """
+    def __init__(self, cell_size = 64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.boxes = []
+
+    def cell_range(self, x1, y1, x2, y2):
+        size = self.cell_size
+        for cx in range(int(x1 // size), int(x2 // size) + 1):
+            for cy in range(int(y1 // size), int(y2 // size) + 1):
+                yield (cx, cy)
+
+    def add(self, bbox):
+        x1, y1, x2, y2 = bbox
+        index = len(self.boxes)
+        self.boxes.append(bbox)
+        for cell in self.cell_range(x1, y1, x2, y2):
+            self.cells.setdefault(cell, []).append(index)
+        return index
+
+    def clear(self):
+        self.cells = {}
+        self.boxes = []
+
+    def query_point(self, x, y):
+        """Returns the items whose box contains (x, y), borders included."""
+        candidates = self.cells.get((int(x // self.cell_size), int(y // self.cell_size)), [])
+        result = []
+        for index in candidates:
+            x1, y1, x2, y2 = self.boxes[index]
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                result.append(index)
+        return result
+
+    def query_rect(self, x1, y1, x2, y2):
+        """Returns the items whose box overlaps the rectangle, borders included."""
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+
+        found = set()
+        for cell in self.cell_range(x1, y1, x2, y2):
+            found.update(self.cells.get(cell, ()))
+
+        result = []
+        for index in sorted(found):
+            bx1, by1, bx2, by2 = self.boxes[index]
+            if bx1 <= x2 and x1 <= bx2 and by1 <= y2 and y1 <= by2:
+                result.append(index)
+        return result
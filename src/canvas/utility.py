@@ -13,12 +13,12 @@ def check_overlap(rect1, rect2):
 
     return True
 
-def get_image_extent(widget, pix):
+def get_fit_extent(widget, width, height):
     window_width = max(widget.winfo_width(), 1)  # ensure width is at least 1
     window_height = max(widget.winfo_height(), 1)  # ensure height is at least 1
 
     window_ratio = window_width / window_height
-    page_ratio = pix.width / pix.height
+    page_ratio = width / height
 
     if window_ratio < page_ratio:
         # Window is relatively taller than the page, so scale based on width
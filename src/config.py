@@ -6,16 +6,60 @@ load_dotenv()
 
 class Configuration:
 
+    # deepl, openai or mock; by default DeepL is used when its key is set, then OpenAI
+    TRANSLATION_PROVIDER = os.getenv("TRANSLATION_PROVIDER")
+
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+    OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 120))
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
+
+    # overrides the context window looked up from the model name
+    OPENAI_CONTEXT_WINDOW = int(os.getenv("OPENAI_CONTEXT_WINDOW")) if os.getenv("OPENAI_CONTEXT_WINDOW") else None
+
+    # number of translation requests in flight when translating a whole page range
+    TRANSLATE_CONCURRENCY = int(os.getenv("TRANSLATE_CONCURRENCY", 8))
+
+    # short paragraphs are packed into one request up to this many source tokens,
+    # paragraphs longer than TRANSLATE_PACK_ITEM_TOKENS are always sent alone
+    TRANSLATE_PACK_TOKENS = int(os.getenv("TRANSLATE_PACK_TOKENS", 1500))
+    TRANSLATE_PACK_ITEM_TOKENS = int(os.getenv("TRANSLATE_PACK_ITEM_TOKENS", 200))
+
+    # provider limits the requests are throttled to, and how failed requests are retried
+    OPENAI_REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_REQUESTS_PER_MINUTE", 500))
+    OPENAI_TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TOKENS_PER_MINUTE", 40000))
+    DEEPL_REQUESTS_PER_MINUTE = int(os.getenv("DEEPL_REQUESTS_PER_MINUTE", 60))
+    TRANSLATE_MAX_RETRIES = int(os.getenv("TRANSLATE_MAX_RETRIES", 5))
+    TRANSLATE_BACKOFF_BASE = float(os.getenv("TRANSLATE_BACKOFF_BASE", 1))
+    TRANSLATE_BACKOFF_MAX = float(os.getenv("TRANSLATE_BACKOFF_MAX", 60))
+    TRANSLATE_BREAKER_THRESHOLD = int(os.getenv("TRANSLATE_BREAKER_THRESHOLD", 8))
+    TRANSLATE_BREAKER_COOLDOWN = float(os.getenv("TRANSLATE_BREAKER_COOLDOWN", 30))
 
     PROMPT_DIR = os.getenv("PROMPT_DIR", "./prompt")
     CACHE_DIR = os.getenv("CACHE_DIR", "./cache")
     EXPORT_DIR = os.getenv("EXPORT_DIR", "./export")
 
+    # number of worker processes used for pdfminer layout analysis, 1 disables the parallel mode
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", os.cpu_count() or 1))
+
+    # number of documents converted concurrently in the headless batch mode
+    BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", os.cpu_count() or 1))
+
+    # memory budget for rasterized pages kept in memory
+    PIXMAP_CACHE_MB = int(os.getenv("PIXMAP_CACHE_MB", 256))
+
+    # number of journaled edits after which the context snapshot is rewritten
+    JOURNAL_COMPACT_THRESHOLD = int(os.getenv("JOURNAL_COMPACT_THRESHOLD", 200))
+
     DEEPL_RAPID_API_KEY = os.getenv("DEEPL_RAPID_API_KEY")
     DEEPL_RAPID_API_HOST = os.getenv("DEEPL_RAPID_API_HOST")
     DEEPL_RAPID_API_SRC_LANG = os.getenv("DEEPL_RAPID_API_SRC_LANG", "AUTO")
     DEEPL_RAPID_API_DST_LANG = os.getenv("DEEPL_RAPID_API_DST_LANG", "KO")
+    DEEPL_API_URL = os.getenv("DEEPL_API_URL", "https://deepl-translator.p.rapidapi.com/translate")
+    DEEPL_TIMEOUT = float(os.getenv("DEEPL_TIMEOUT", 30))
+
+    # seconds the mock provider takes to answer a request
+    MOCK_TRANSLATION_LATENCY = float(os.getenv("MOCK_TRANSLATION_LATENCY", 0.2))
 
     TEXT_FONT = os.getenv("TEXT_FONT", "tkDefaultFont")
     TEXT_FONT_SIZE = os.getenv("TEXT_FONT_SIZE", 11)
@@ -1,58 +1,10 @@
 import os
 import argparse
-import requests
-from tqdm import tqdm
-from urllib.parse import urlparse
-import tkinter as tk
-from tkinter import font
-from src.pdf_viewer import PDFViewer
 from src.config import global_config
+from src.service.download_service import is_url, try_download
+from src.batch import run_batch
 import pyperclip
 
-def is_url(string):
-    try:
-        result = urlparse(string)
-        return all([result.scheme, result.netloc])
-    except ValueError:
-        return False
-
-def get_filename_from_url(url):
-    parsed_url = urlparse(url)
-    filename = os.path.basename(parsed_url.path)
-    return filename
-
-def download_file(url, destination):
-    response = requests.get(url, stream=True)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-        total_size_in_bytes= int(response.headers.get('content-length', 0))
-
-        progress_bar = None
-        if total_size_in_bytes > 0:
-            progress_bar = tqdm(total=total_size_in_bytes, unit='iB', unit_scale=True)
-
-        with open(destination, 'wb') as file:
-            for chunk in response.iter_content(chunk_size=1024):
-                if progress_bar is not None:
-                    progress_bar.update(len(chunk))
-                file.write(chunk)
-
-        if progress_bar is not None:
-            progress_bar.close()
-
-        if total_size_in_bytes != 0 and progress_bar.n != total_size_in_bytes:
-            print("Error, something went wrong.")
-            os.remove(destination)
-            return False
-
-        print("File downloaded successfully in ", destination)
-        return True
-
-    else:
-        print("Failed to download file: ", response.status_code)
-        return False
-
 def get_path_name_to_open(args):
     # Get the input file
     path_name = args.f
@@ -70,41 +22,6 @@ def get_path_name_to_open(args):
 
     return path_name
 
-def is_arxiv_url(url):
-    return url.startswith('https://arxiv.org/abs/')
-
-def is_hugging_face_url(url):
-    return url.startswith('https://huggingface.co/papers/')
-
-def try_download(url, intm_dir):
-
-    print("URL detected, trying to download file...")
-
-    # if arxiv URL, download PDF instead
-    if is_arxiv_url(url):
-        print("Arxiv URL detected, downloading PDF instead")
-        url = url.replace('https://arxiv.org/abs/', 'https://arxiv.org/pdf/')
-        url += ".pdf"
-    elif is_hugging_face_url(url):
-        print("Hugging Face URL detected, downloading PDF instead")
-        url = url.replace('https://huggingface.co/papers/', 'https://arxiv.org/pdf/')
-        url += ".pdf"
-
-    file_name = get_filename_from_url(url)
-    if file_name == "":
-        print("Failed to get filename from URL")
-        return None
-
-    path_name = os.path.join(intm_dir, file_name)
-
-    if os.path.isfile(path_name):
-        print(f"File '{path_name}' already exists, skipping download")
-    else:
-        if not download_file(url, path_name):
-            return None
-    
-    return path_name
-
 def get_arguments():
     # Create the parser
     parser = argparse.ArgumentParser(description='Pdf2md: Loads a PDF file and exports to a text file.')
@@ -113,15 +30,40 @@ def get_arguments():
     parser.add_argument('--f', type=str, help='The PDF file to view')
     parser.add_argument('--l', action='store_true', help='Lists available fonts and exit')
     parser.add_argument('--i', action='store_true', help='Ignores context cache and loads the PDF file again')
+    parser.add_argument('--b', type=str, nargs='+', help='Converts PDF files, directories, glob patterns or URLs to text files without the GUI')
+    parser.add_argument('--w', type=int, help='Number of documents converted concurrently with --b')
+    parser.add_argument('--t', action='store_true', help='Translates whole documents before exporting them with --b')
 
     # Parse the arguments
     args = parser.parse_args()
 
     return args
 
+def get_directories():
+    intm_dir = global_config.CACHE_DIR
+    intm_dir = os.path.abspath(intm_dir)
+    os.makedirs(intm_dir, exist_ok=True)
+
+    export_dir = global_config.EXPORT_DIR
+    export_dir = os.path.abspath(export_dir)
+    os.makedirs(export_dir, exist_ok=True)
+
+    return intm_dir, export_dir
+
 def main():
     args = get_arguments()
 
+    if args.b is not None:
+        # headless batch conversion, Tk is never touched
+        intm_dir, export_dir = get_directories()
+        run_batch(args.b, intm_dir, export_dir, args.w, args.i, args.t)
+        return
+
+    # imported here, so that the batch mode also runs on machines without Tk or a display
+    import tkinter as tk
+    from tkinter import font
+    from src.pdf_viewer import PDFViewer
+
     root = tk.Tk()
     root.title("pdf2md")
     root.geometry('1200x800')  # set initial window size
@@ -139,13 +81,7 @@ def main():
         print("No input file specified")
         return
     
-    intm_dir = global_config.CACHE_DIR
-    intm_dir = os.path.abspath(intm_dir)
-    os.makedirs(intm_dir, exist_ok=True)
-
-    export_dir = global_config.EXPORT_DIR
-    export_dir = os.path.abspath(export_dir)
-    os.makedirs(export_dir, exist_ok=True)
+    intm_dir, export_dir = get_directories()
 
     # download file if URL
     if is_url(path_name):
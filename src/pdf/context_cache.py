@@ -0,0 +1,84 @@
+import os
+import json
+import pickle
+import struct
+import hashlib
+import zlib
+import tempfile
+
+class ContextCache:
+    """Stores the pickled context of a PDF, keyed by the PDF content and the extraction parameters.
+
+    Every entry starts with a header holding the format version, the full cache key, the payload length
+    and a CRC32 of the payload, so stale or damaged entries are rejected without unpickling them.
+    """
+    MAGIC = b"P2MC"
+    VERSION = 2
+    HEADER = struct.Struct("<4sI32sQI")   # magic, version, key, payload length, payload crc32
+
+    def __init__(self, intm_dir, pdf_path, params):
+        self.key = ContextCache.make_key(pdf_path, params)
+
+        # named by the key alone, so a renamed or duplicated copy of the same PDF shares the entry
+        self.path = os.path.join(intm_dir, f"{self.key.hex()}.context")
+
+    @staticmethod
+    def make_key(pdf_path, params):
+        digest = hashlib.sha256()
+        with open(pdf_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(json.dumps(params, sort_keys=True, default=repr).encode("utf-8"))
+        digest.update(struct.pack("<I", ContextCache.VERSION))
+        return digest.digest()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as file:
+                header = file.read(ContextCache.HEADER.size)
+                if len(header) != ContextCache.HEADER.size:
+                    print("Cached PDF is truncated, rebuilding")
+                    return None
+
+                magic, version, key, length, crc = ContextCache.HEADER.unpack(header)
+                if magic != ContextCache.MAGIC or version != ContextCache.VERSION or key != self.key:
+                    print("Cached PDF does not match the PDF or the extraction parameters, rebuilding")
+                    return None
+
+                payload = file.read()
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    print("Cached PDF is corrupted, rebuilding")
+                    return None
+
+            return pickle.loads(payload)
+
+        except Exception as e:
+            print("Loading cached PDF failed")
+            print(e)
+            return None
+
+    def save(self, context):
+        self.write(ContextCache.serialize(context))
+
+    @staticmethod
+    def serialize(context):
+        return pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(self, payload):
+        header = ContextCache.HEADER.pack(ContextCache.MAGIC, ContextCache.VERSION, self.key, len(payload), zlib.crc32(payload))
+
+        # write to a temporary file first, so that an interrupted save never leaves a broken entry behind;
+        # the name is unique, other processes may be saving the same entry at the same time
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(header)
+                file.write(payload)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -0,0 +1,78 @@
+import os
+import json
+import tempfile
+import threading
+
+class EditJournal:
+    """Append-only log of edit operations, replayed on top of the last context snapshot.
+
+    Each line is a JSON record with a sequence number. The snapshot remembers the last sequence
+    number it contains, so records are only replayed when they are newer than the snapshot, and
+    compaction can drop the older ones at any time.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0          # records appended since the last compaction
+        self.lock = threading.Lock()
+
+    def read(self):
+        records = []
+        if not os.path.exists(self.path):
+            return records
+
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                    records.append((record["seq"], record["op"], record["args"]))
+                except (ValueError, KeyError):
+                    # an interrupted append leaves a partial last line behind
+                    break
+
+        self.count = len(records)
+        return records
+
+    def append(self, seq, op, args):
+        line = json.dumps({ "seq": seq, "op": op, "args": args }, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line)
+            self.file.flush()
+            self.count += 1
+
+    def compact(self, seq):
+        """Drops the records that are already contained in a snapshot taken at seq."""
+        with self.lock:
+            self.close_file()
+            records = [r for r in self.read() if r[0] > seq]
+            self.count = len(records)
+
+            # a unique temporary name, another process may be compacting the same journal
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    for record_seq, op, args in records:
+                        file.write(json.dumps({ "seq": record_seq, "op": op, "args": args }, ensure_ascii=False) + "\n")
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+    def clear(self):
+        with self.lock:
+            self.close_file()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.count = 0
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        with self.lock:
+            self.close_file()
@@ -0,0 +1,120 @@
+import os
+import mmap
+import struct
+import threading
+from io import BytesIO
+from PIL import Image
+
+class PageStore:
+    """Append-only store of encoded page images, read back through a memory map.
+
+    The file starts with a header holding the cache key of the context it belongs to, followed by
+    records of (page number, image size, length, JPEG bytes). The offset table is rebuilt by walking the
+    record headers when the store is opened; when a page is stored more than once, the last record wins.
+    """
+    MAGIC = b"P2MP"
+    HEADER = struct.Struct("<4s32s")        # magic, cache key
+    RECORD = struct.Struct("<IIIQ")         # page number, width, height, payload length
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.offsets = {}                   # page number -> (offset, length)
+        self.sizes = {}                     # page number -> (width, height) of the stored image
+        self.map = None
+        self.lock = threading.Lock()
+        self.open()
+
+    def open(self):
+        header = PageStore.HEADER.pack(PageStore.MAGIC, self.key)
+
+        valid = False
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as file:
+                valid = file.read(PageStore.HEADER.size) == header
+
+        if not valid:
+            # missing, or written for another PDF or parameter set
+            with open(self.path, 'wb') as file:
+                file.write(header)
+            return
+
+        with open(self.path, 'r+b') as file:
+            size = os.fstat(file.fileno()).st_size
+            offset = PageStore.HEADER.size
+            while offset + PageStore.RECORD.size <= size:
+                file.seek(offset)
+                page_number, width, height, length = PageStore.RECORD.unpack(file.read(PageStore.RECORD.size))
+                if offset + PageStore.RECORD.size + length > size:
+                    break
+                self.offsets[page_number] = (offset + PageStore.RECORD.size, length)
+                self.sizes[page_number] = (width, height)
+                offset += PageStore.RECORD.size + length
+
+            if offset != size:
+                # drop the incomplete record left behind by an interrupted append
+                file.truncate(offset)
+
+    def __contains__(self, page_number):
+        return page_number in self.offsets
+
+    def get_size(self, page_number):
+        """The size of the stored image, without decoding it, or None when the page is not stored."""
+        return self.sizes.get(page_number)
+
+    def get_view(self, page_number):
+        """Returns a memoryview over the encoded page in the map; it must be released before the map can close."""
+        with self.lock:
+            location = self.offsets.get(page_number)
+            if location is None:
+                return None
+            if self.map is None:
+                with open(self.path, 'rb') as file:
+                    self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            offset, length = location
+            return memoryview(self.map)[offset:offset + length]
+
+    def get(self, page_number, size = None):
+        """Decodes a stored page; with a size, the JPEG is decoded at the smallest scale that still covers it.
+
+        The encoded bytes are copied once out of the map for the decoder, the decoded image is independent of the map.
+        """
+        view = self.get_view(page_number)
+        if view is None:
+            return None
+        try:
+            image = Image.open(BytesIO(view))
+            if size is not None:
+                image.draft("RGB", size)
+            image.load()
+            return image
+        finally:
+            view.release()
+
+    def put(self, page_number, image):
+        byte_arr = BytesIO()
+        image.save(byte_arr, format='JPEG')
+        payload = byte_arr.getbuffer()
+
+        with self.lock:
+            # the map cannot grow with the file, it is reopened on the next read
+            self.close_map()
+            with open(self.path, 'ab') as file:
+                offset = file.tell()
+                file.write(PageStore.RECORD.pack(page_number, image.width, image.height, len(payload)))
+                file.write(payload)
+            self.offsets[page_number] = (offset + PageStore.RECORD.size, len(payload))
+            self.sizes[page_number] = image.size
+
+    def close_map(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # a view is still exported, the map is released when it is garbage collected
+                pass
+            self.map = None
+
+    def close(self):
+        with self.lock:
+            self.close_map()
@@ -1,15 +1,21 @@
 import os
 import sys
+import threading
+import functools
+from contextlib import contextmanager
 import fitz  # PyMuPDF
-import pickle
-from io import BytesIO
-from PIL import Image
+from concurrent.futures import ProcessPoolExecutor
 from pdfminer.layout import LAParams
 from pdfminer.high_level import extract_pages
 from src.pdf.pdf_element import PdfRect, PdfElement
+from src.pdf.pixmap_cache import PixmapCache
+from src.pdf.context_cache import ContextCache
+from src.pdf.page_store import PageStore
+from src.pdf.edit_journal import EditJournal
 from src.canvas.utility import check_overlap
 from src.service.openai_completion_service import OpenAICompletionService, CompletionResult
 from src.service.prompt_manager import prompt_manager
+from src.config import global_config
 
 class PdfPage:
     def __init__(self, page_number, elements = None):
@@ -21,56 +27,89 @@ class PdfPage:
     def append(self, key, element):
         self.elements.append((key, element))
 
+def extract_pdf_pages(pdf_path, params, page_numbers):
+    """Runs pdfminer layout analysis on the given (0-based) pages and returns unkeyed PdfPage objects.
+
+    This is a module level function so that it can be sent to worker processes.
+    """
+    pages = []
+    pdfminer_pages = extract_pages(pdf_path, page_numbers = page_numbers, laparams = params)
+    for page_number, pdfminer_page in zip(page_numbers, pdfminer_pages):
+        page = PdfPage(page_number + 1)
+        page.width, page.height = pdfminer_page.width, pdfminer_page.height
+
+        for element in pdfminer_page:
+            if PdfElement.can_be_created(element):
+                # keys are assigned by the parent, in page order
+                page.append(None, PdfElement.from_pdfminer(page_number + 1, element))
+
+        pages.append(page)
+    return pages
+
+def batched(method):
+    """Runs an edit inside a batch, so that its chains are rebuilt when the outermost batch ends."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.batch():
+            # edits depend on the safe flags, so a margin change deferred earlier in the batch is applied first
+            self.refresh_safe_area()
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Pdf:
     class Context:
         def __init__(self):
             self.margin = PdfRect(0.15, 0.08, 0.85, 0.92)
             self.pages = []
             self.index = 0
+            self.journal_seq = 0    # last journal record contained in this snapshot
 
-        def save_to_pickle(self, filename):
-            with open(filename, 'wb') as file:
-                pickle.dump(self, file)
-
-        @staticmethod
-        def load_from_pickle(filename):
-            with open(filename, 'rb') as file:
-                context = pickle.load(file)
-            return context
+    # documents shorter than this are not worth spawning worker processes for
+    MIN_PAGES_PER_WORKER = 4
 
-    def __init__(self, pdf_path, intm_dir, ignore_cache = False):
+    def __init__(self, pdf_path, intm_dir, ignore_cache = False, extract_workers = None):
         self.intm_dir = intm_dir
-        self.intm_path = os.path.join(
-            intm_dir, 
-            os.path.splitext(os.path.basename(pdf_path))[0] + ".context")
 
-        params = LAParams(
-            line_overlap = 0.5, 
-            char_margin = 2.0, 
-            line_margin = 0.5, 
-            word_margin = 0.1, 
-            boxes_flow = 0.5, 
-            detect_vertical = False, 
-            all_texts = False)
+        params = Pdf.layout_params()
 
+        try:
+            self.cache = ContextCache(intm_dir, pdf_path, Pdf.cache_params(params))
+        except OSError as e:
+            print("Loading PDF failed")
+            print(e)
+            sys.exit(1)
+
+        self.intm_path = self.cache.path
         self.context = None
 
-        if os.path.exists(self.intm_path):
-            try:
-                if ignore_cache:
-                    print("Cached PDF found, but ignoring it by --i option")
-                else:
-                    self.context = Pdf.Context.load_from_pickle(self.intm_path)
+        # edits are appended to the journal and folded into the cached context from time to time
+        self.journal = EditJournal(os.path.splitext(self.intm_path)[0] + ".journal")
+        self.journal_seq = 0
+        self.replaying = False
+        self.compactor = None
+
+        # state deferred until the outermost batch ends
+        self.batch_depth = 0
+        self.safe_area_dirty = False
+        self.chains_dirty = False       # all chains must be rebuilt
+        self.dirty_pages = None         # (first, last) page range whose chains must be rebuilt
+        self.dirty_removed = []         # keys removed since the last rebuild
+
+        if self.cache.exists():
+            if ignore_cache:
+                print("Cached PDF found, but ignoring it by --i option")
+            else:
+                self.context = self.cache.load()
+                if self.context is not None:
                     print("Loaded cached PDF from", self.intm_path)
-            except:
-                print("Loading cached PDF failed")
         
         self.tables = []
 
         if self.context is None:
             try:
-                doc = fitz.open(pdf_path)
-                pdfminer_pages = list(extract_pages(pdf_path, laparams = params))
+                with fitz.open(pdf_path) as doc:
+                    page_count = doc.page_count
+                pages = Pdf.extract_layout(pdf_path, params, page_count, extract_workers)
 
                 # camelot requires Ghostscript to be installed, too much hassle
                 # tables = camelot.read_pdf(pdf_path)
@@ -98,40 +137,75 @@ class Pdf:
                 sys.exit(1)
                 
             self.context = Pdf.Context()
-            self.build_element_list(doc, pdfminer_pages)
+            self.build_element_list(pages)
             self.recalculate_safe_area()
-            self.save()
 
-        # reconstruct images from pickled bytes
-        self.images = []
-        for page in self.context.pages:
-            byte_arr = BytesIO(page.bytes_content)
-            self.images.append(Image.open(byte_arr))
+            # edits recorded against a previous snapshot do not apply to the rebuilt context
+            self.journal.clear()
+            self.snapshot()
+
+        # pages are rasterized on demand, when they are first viewed, and kept in a store next to the context
+        self.page_store = PageStore(os.path.splitext(self.intm_path)[0] + ".pages", self.cache.key)
+        self.pixmaps = PixmapCache(pdf_path, global_config.PIXMAP_CACHE_MB * 1024 * 1024, self.page_store)
+
+        self.build_key_index()
 
         # reconstruct chain list
+        self.build_body_table()
         self.build_chain_list()
 
-    def build_element_list(self, doc, pdfminer_pages):
-        for page_number, pdfminer_page in enumerate(pdfminer_pages):
+        # reapply the edits made since the last snapshot
+        self.replay_journal()
+
+    @staticmethod
+    def layout_params():
+        return LAParams(
+            line_overlap = 0.5, 
+            char_margin = 2.0, 
+            line_margin = 0.5, 
+            word_margin = 0.1, 
+            boxes_flow = 0.5, 
+            detect_vertical = False, 
+            all_texts = False)
+
+    @staticmethod
+    def cache_params(params):
+        return { "laparams": vars(params) }
+
+    @staticmethod
+    def cache_key(pdf_path):
+        """The context cache key of a PDF; PDFs with the same key share their cache, journal and page store files."""
+        return ContextCache.make_key(pdf_path, Pdf.cache_params(Pdf.layout_params()))
+
+    @staticmethod
+    def extract_layout(pdf_path, params, page_count, workers = None):
+        if workers is None:
+            workers = global_config.EXTRACT_WORKERS
+        workers = max(1, min(workers, page_count // Pdf.MIN_PAGES_PER_WORKER))
+
+        if workers <= 1:
+            return extract_pdf_pages(pdf_path, params, list(range(page_count)))
 
-            self.context.pages.append(PdfPage(page_number + 1))
+        # split the page range into contiguous chunks, one per worker
+        chunk_size = (page_count + workers - 1) // workers
+        chunks = [list(range(start, min(start + chunk_size, page_count))) for start in range(0, page_count, chunk_size)]
 
-            cur_page = self.context.pages[-1]
-            cur_page.width, cur_page.height = pdfminer_page.width, pdfminer_page.height
+        print(f"Extracting {page_count} pages with {len(chunks)} worker processes")
 
-            doc_page = doc.load_page(page_number)
-            pix = doc_page.get_pixmap(matrix=fitz.Matrix(2, 2))  # This is your pixmap from PyMuPDF
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            byte_arr = BytesIO()
-            img.save(byte_arr, format='JPEG')            
-            
-            # Get the bytes content
-            cur_page.bytes_content = byte_arr.getvalue()            
+        pages = []
+        with ProcessPoolExecutor(max_workers = len(chunks)) as executor:
+            # map() returns the results in submission order, so pages stay in page order
+            for chunk_pages in executor.map(extract_pdf_pages, [pdf_path] * len(chunks), [params] * len(chunks), chunks):
+                pages.extend(chunk_pages)
+        return pages
 
-            for element in pdfminer_page:
-                if PdfElement.can_be_created(element):
-                    cur_page.append(self.context.index, PdfElement.from_pdfminer(page_number + 1, element))
-                    self.context.index += 1
+    def build_element_list(self, pages):
+        for page in pages:
+            # assign keys sequentially in page order, so that they do not depend on the worker layout
+            page.elements = [(self.context.index + i, element) for i, (_, element) in enumerate(page.elements)]
+            self.context.index += len(page.elements)
+
+            self.context.pages.append(page)
 
     def recalculate_safe_area(self):
         for page in self.context.pages:
@@ -147,16 +221,75 @@ class Pdf:
     def build_chain_list(self):
         self.chains = {}
         self.to_chain = {}
+        self.chain_members = {}     # head key -> keys of the chain, in order
+
+        # page texts depend on the chains
+        self.page_segments = {}
+
+        self.scan_chains(0, 0)
+
+    def update_chains(self, first_page, last_page, removed_keys = ()):
+        """Recomputes only the chains touching the edited pages, with the same result as build_chain_list.
+
+        The scan starts at the head of the chain running into first_page, if any, and stops at the first
+        body element after last_page where no chain is open, neither before nor after the edit.
+        Returns the range of pages that were scanned.
+        """
+        start_page, start_position = first_page, 0
 
+        prev_key, prev_body = self.find_last_body_key_before(first_page)
+        if prev_body is not None and prev_body.contd is not None:
+            # a chain runs into the edited pages, rescan it from its head
+            start_page, start_position, _ = self.key_index[self.to_chain[prev_key]]
+
+        fresh, stale = set(), set()
+
+        # chains of removed elements are dropped, their remaining members are rescanned below
+        for key in removed_keys:
+            head = self.to_chain.get(key)
+            if head is not None:
+                self.purge_chain(head, fresh, stale)
+
+        end_page = self.scan_chains(start_page, start_position, last_page, fresh, stale)
+
+        # every chain that changed lies within the scanned pages
+        self.invalidate_page_texts(start_page, end_page)
+
+        return start_page, end_page
+
+    def purge_chain(self, head, fresh, stale):
+        for member in self.chain_members.pop(head, ()):
+            if member not in fresh:
+                self.to_chain.pop(member, None)
+                stale.add(member)
+        self.chains.pop(head, None)
+
+    def scan_chains(self, start_page, start_position, last_page = None, fresh = None, stale = None):
         last_head_key = None
         last_head = None
         last_text = None
 
         prev_body = None
 
-        for page in self.context.pages:
-            for key, element in page.elements:
-                if element.visible and element.safe and element.body:
+        for page_index in range(start_page, len(self.context.pages)):
+            elements = self.context.pages[page_index].elements
+            if page_index == start_page:
+                elements = elements[start_position:]
+
+            for key, element in elements:
+                body = element.visible and element.safe and element.body
+
+                if last_page is not None:
+                    if body and page_index > last_page and last_head is None and key not in stale:
+                        # no chain is open here, neither in the old nor in the new chain list, so the rest is unchanged
+                        return page_index
+
+                    # drop the old chain of this element, it is rebuilt as the scan goes on
+                    head = self.to_chain.get(key)
+                    if head is not None:
+                        self.purge_chain(head, fresh, stale)
+
+                if body:
                     if last_head is None:
                         if element.contd is not None:
                             # new chain
@@ -164,6 +297,9 @@ class Pdf:
 
                             # save chain head
                             self.to_chain[key] = key
+                            self.chain_members[key] = [key]
+                            if fresh is not None:
+                                fresh.add(key)
                         else:
                             # new line
                             #self.chain_list.append((key, element, element.text))
@@ -182,6 +318,9 @@ class Pdf:
 
                         # save chain head
                         self.to_chain[key] = last_head_key
+                        self.chain_members[last_head_key].append(key)
+                        if fresh is not None:
+                            fresh.add(key)
 
                         if element.contd is None:
                             # end of chain
@@ -193,13 +332,40 @@ class Pdf:
         if last_head is not None:
             self.chains[last_head_key] = (last_head, last_text)
 
+        return len(self.context.pages) - 1
+
+    def build_body_table(self):
+        # last body (key, element) of each page, and of all pages before each page
+        self.page_last_body = [self.find_page_last_body(page) for page in self.context.pages]
+        self.last_body_until = [(None, None)]
+        for entry in self.page_last_body:
+            self.last_body_until.append(entry if entry[1] is not None else self.last_body_until[-1])
+
+    def update_body_table(self, first_page, last_page):
+        for page_index in range(first_page, last_page + 1):
+            self.page_last_body[page_index] = self.find_page_last_body(self.context.pages[page_index])
+
+        for page_index in range(first_page + 1, len(self.last_body_until)):
+            entry = self.page_last_body[page_index - 1]
+            if entry[1] is None:
+                entry = self.last_body_until[page_index - 1]
+            if page_index > last_page + 1 and entry is self.last_body_until[page_index]:
+                # the pages after this one are not affected by the edit
+                break
+            self.last_body_until[page_index] = entry
+
+    @staticmethod
+    def find_page_last_body(page):
+        for key, element in reversed(page.elements):
+            if element.visible and element.safe and element.body:
+                return key, element
+        return None, None
+
+    def find_last_body_key_before(self, page):
+        return self.last_body_until[min(page, len(self.last_body_until) - 1)]
+
     def find_last_body_element_until(self, page):
-        prev_element = None
-        for i in range(page):
-            for _, element in self.iter_elements_page(i):
-                if element.visible and element.safe and element.body:
-                    prev_element = element
-        return prev_element
+        return self.find_last_body_key_before(page)[1]
 
     def get_chained_text(self, key_to_find):
         if self.to_chain.get(key_to_find) is None:
@@ -210,7 +376,21 @@ class Pdf:
             return (key, self.chains[key][0], self.chains[key][1]) if key is not None else (None, None, None)
     
     def get_page_text(self, page):
-        text = ""
+        return "".join(text for _, text in self.get_page_segments(page))
+
+    def get_page_segments(self, page):
+        """Returns the page text as (key, text) segments, one per element that contributes to it.
+
+        Chains are keyed by their head. Segments are cached until an edit, a chain or a translation on the page changes.
+        """
+        segments = self.page_segments.get(page)
+        if segments is None:
+            segments = self.build_page_segments(page)
+            self.page_segments[page] = segments
+        return segments
+
+    def build_page_segments(self, page):
+        parts = []
 
         in_continue = True
 
@@ -223,32 +403,39 @@ class Pdf:
                     in_continue = False
                 else:
                     if element.body:
-                        text += "(omitted by continuation)\n"
+                        parts.append((key, "(omitted by continuation)\n"))
 
             if not in_continue:
                 if self.to_chain.get(key) is not None:
                     if self.to_chain[key] == key:
                         # it is a head of a chain
                         if element.translated is not None:
-                            text += element.translated + "\n"
+                            parts.append((key, element.translated + "\n"))
                         else:
-                            text += self.chains[key][1] + "\n"
+                            parts.append((key, self.chains[key][1] + "\n"))
                     else:
                         # it is a continuation of a chain
                         pass
                 else:
-                    text += element.translated if element.translated is not None else element.text
-                    text += "\n"
+                    parts.append((key, (element.translated if element.translated is not None else element.text) + "\n"))
             else:
                 if not element.body:
-                    text += element.text + "\n"
+                    parts.append((key, element.text + "\n"))
 
-        return text
+        return parts
+
+    def invalidate_page_texts(self, first_page, last_page):
+        for page in range(first_page, last_page + 1):
+            self.page_segments.pop(page, None)
 
     def get_text(self):
-        text = ""
+        return "".join(self.iter_text())
 
+    def iter_text(self):
+        """Generator method yielding the document text page by page, for exports."""
         for page in self.context.pages:
+            parts = []
+
             for key, element in page.elements:
                 if not element.safe or not element.visible:
                     continue  # Skip unsafe or invisible elements
@@ -257,60 +444,136 @@ class Pdf:
                     if self.to_chain[key] == key:
                         # it is a head of a chain
                         if element.translated is not None:
-                            text += element.translated + "\n"
+                            parts.append(element.translated + "\n")
                         else:
-                            text += self.chains[key][1] + "\n"
+                            parts.append(self.chains[key][1] + "\n")
                     else:
                         # it is a continuation of a chain
                         pass
                 else:
-                    text += element.translated if element.translated is not None else element.text
-                    text += "\n"
+                    parts.append(element.translated if element.translated is not None else element.text)
+                    parts.append("\n")
+
+            yield "".join(parts)
+
+    @contextmanager
+    def batch(self):
+        """Groups edits, so that chains, safe area and the saved state are updated once when the outermost batch ends."""
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.commit_batch()
+
+    def commit_batch(self):
+        self.refresh_safe_area()
+
+        if self.chains_dirty:
+            self.build_body_table()
+            self.build_chain_list()
+        elif self.dirty_pages is not None:
+            self.update_body_table(self.dirty_pages[0], self.dirty_pages[1])
+            self.update_chains(self.dirty_pages[0], self.dirty_pages[1], self.dirty_removed)
+
+        self.chains_dirty = False
+        self.dirty_pages = None
+        self.dirty_removed = []
+
+        self.save()
+
+    def refresh_safe_area(self):
+        if self.safe_area_dirty:
+            self.safe_area_dirty = False
+            self.recalculate_safe_area()
+            self.chains_dirty = True
 
-        return text
+    def invalidate_chains(self, first_page, last_page, removed_keys = ()):
+        if self.dirty_pages is None:
+            self.dirty_pages = (first_page, last_page)
+        else:
+            self.dirty_pages = (min(self.dirty_pages[0], first_page), max(self.dirty_pages[1], last_page))
+        self.dirty_removed.extend(removed_keys)
 
+    @batched
     def set_safe_margin(self, margin):
         self.context.margin = margin
-        self.recalculate_safe_area()
-        self.build_chain_list()
+        self.safe_area_dirty = True
 
+        self.record("set_safe_margin", *margin.as_tuple())
+
+    @batched
     def toggle_visibility(self, key):
         e = self.get_element(key)
         e.visible = not e.visible if e is not None else None
 
-        # rebuild chain list
-        self.build_chain_list()
+        # rebuild the chains around the element, when the batch ends
+        if e is not None:
+            page_index = self.key_index[key][0]
+            self.invalidate_chains(page_index, page_index)
+
+        self.record("toggle_visibility", key)
 
+    @batched
     def toggle_body(self, key):
         e = self.get_element(key)
         e.body = not e.body if e is not None else None
 
-        # rebuild chain list
-        self.build_chain_list()
+        # rebuild the chains around the element, when the batch ends
+        if e is not None:
+            page_index = self.key_index[key][0]
+            self.invalidate_chains(page_index, page_index)
+
+        self.record("toggle_body", key)
 
+    @batched
     def toggle_continue(self, key):
         e = self.get_element(key)
         e.toggle_continue() if e is not None else None
 
-        # rebuild chain list
-        self.build_chain_list()
+        # rebuild the chains around the element, when the batch ends
+        if e is not None:
+            page_index = self.key_index[key][0]
+            self.invalidate_chains(page_index, page_index)
 
+        self.record("toggle_continue", key)
+
+    def set_translation(self, key, text, persist = True):
+        """Sets the translation of an element, partial results of a streamed translation are not persisted."""
+        entry = self.key_index.get(key)
+        if entry is not None:
+            entry[2].translated = text
+            self.invalidate_page_texts(entry[0], entry[0])
+            if persist:
+                self.record("set_translation", key, text)
+
+    @batched
     def split_element(self, key_to_split):
-        for page in self.context.pages:
-            for i, (key, element) in enumerate(page.elements):
-                if key == key_to_split:
-                    if element.safe and element.visible and element.can_be_split():
-                        # remove the original element
-                        page.elements.pop(i)
-                        # insert new elements at the same position
-                        for j, new_element in enumerate(element.children):
-                            page.elements.insert(i + j, (self.context.index, new_element))
-                            self.context.index += 1
-
-                        # rebuild chain list
-                        self.build_chain_list()
-                        break
+        entry = self.key_index.get(key_to_split)
+        if entry is None:
+            return
+
+        page_index, i, element = entry
+        if element.safe and element.visible and element.can_be_split():
+            page = self.context.pages[page_index]
 
+            # remove the original element
+            page.elements.pop(i)
+            # insert new elements at the same position
+            for j, new_element in enumerate(element.children):
+                page.elements.insert(i + j, (self.context.index, new_element))
+                self.context.index += 1
+
+            del self.key_index[key_to_split]
+            self.index_page(page_index)
+
+            # rebuild the chains around the page, when the batch ends
+            self.invalidate_chains(page_index, page_index, [key_to_split])
+
+            self.record("split_element", key_to_split)
+
+    @batched
     def merge(self, page_number, key_list, concat_or_join):
         if key_list is None or len(key_list) <= 0:
             return
@@ -320,13 +583,16 @@ class Pdf:
       
         # find elements to merge
         to_merge = []
+        merged_keys = []
         for k in key_list:
-            for i, (key, element) in enumerate(page.elements):
-                if key == k:
-                    if element.safe and element.visible and element.can_be_merged():
-                        if insert_position is None or i < insert_position:
-                            insert_position = i
-                        to_merge.append(element)
+            entry = self.key_index.get(k)
+            if entry is not None and entry[0] == page_number:
+                _, i, element = entry
+                if element.safe and element.visible and element.can_be_merged():
+                    if insert_position is None or i < insert_position:
+                        insert_position = i
+                    to_merge.append(element)
+                    merged_keys.append(k)
 
         if len(to_merge) < 2:
             return
@@ -350,9 +616,16 @@ class Pdf:
         for e in to_merge:
             e.marked = False
 
-        # rebuild chain list
-        self.build_chain_list()
+        for k in merged_keys:
+            self.key_index.pop(k, None)
+        self.index_page(page_number)
+
+        # rebuild the chains around the page, when the batch ends
+        self.invalidate_chains(page_number, page_number, merged_keys)
 
+        self.record("merge", page_number, list(key_list), concat_or_join)
+
+    @batched
     def move_element(self, pivot_key, key_to_move, page_index, disposition = "after"):
         if pivot_key == None or key_to_move == None or pivot_key == key_to_move or page_index >= len(self.context.pages):
             return
@@ -361,11 +634,13 @@ class Pdf:
         move_index = None
         page = self.context.pages[page_index]
 
-        for i, (key, element) in enumerate(page.elements):
-            if key == pivot_key and element.safe and element.visible:
-                pivot_index = i
-            elif key == key_to_move and element.safe and element.visible:
-                move_index = i
+        pivot = self.key_index.get(pivot_key)
+        if pivot is not None and pivot[0] == page_index and pivot[2].safe and pivot[2].visible:
+            pivot_index = pivot[1]
+
+        to_move = self.key_index.get(key_to_move)
+        if to_move is not None and to_move[0] == page_index and to_move[2].safe and to_move[2].visible:
+            move_index = to_move[1]
 
         if pivot_index is None or move_index is None:
             return False  # pivot_key or key_to_move was not found in the page
@@ -381,25 +656,32 @@ class Pdf:
             offset = 0
 
         page.elements.insert(pivot_index + offset, element_to_move)
+        self.index_page(page_index)
 
-        # rebuild chain list
-        self.build_chain_list()
+        # rebuild the chains around the page, when the batch ends
+        self.invalidate_chains(page_index, page_index)
+
+        self.record("move_element", pivot_key, key_to_move, page_index, disposition)
 
         return True
 
+    def build_key_index(self):
+        # key -> (page index, position in the page, element)
+        self.key_index = {}
+        for page_index in range(len(self.context.pages)):
+            self.index_page(page_index)
+
+    def index_page(self, page_index):
+        for i, (key, element) in enumerate(self.context.pages[page_index].elements):
+            self.key_index[key] = (page_index, i, element)
+
     def get_element(self, key):
-        for page in self.context.pages:
-            for k, element in page.elements:
-                if k == key:
-                    return element
-        return None
+        entry = self.key_index.get(key)
+        return entry[2] if entry is not None else None
     
     def get_element_in_page(self, page, key):
-        if page < len(self.context.pages):
-            for k, element in self.context.pages[page].elements:
-                if k == key:
-                    return element
-        return None
+        entry = self.key_index.get(key)
+        return entry[2] if entry is not None and entry[0] == page else None
     
     def iter_elements(self):
         """Generator method to iterate over elements safely."""
@@ -414,11 +696,15 @@ class Pdf:
             for key, element in page.elements:
                 yield key, element
 
-    def get_pixmap(self, page_number):
-        return self.images[page_number]
+    def render_page(self, page_number, extent):
+        return self.pixmaps.render_extent(page_number, extent)
+
+    def get_page_preview(self, page_number, extent):
+        return self.pixmaps.get_preview(page_number, extent)
     
     def get_page_ratio(self, page_number):
-        return self.images[page_number].width / self.images[page_number].height
+        page = self.context.pages[page_number]
+        return page.width / page.height
     
     def get_page_extent(self, page_number):
         page = self.context.pages[page_number]
@@ -430,8 +716,64 @@ class Pdf:
     def get_page_number(self):
         return len(self.context.pages)
     
+    def record(self, op, *args):
+        if not self.replaying:
+            self.journal_seq += 1
+            self.journal.append(self.journal_seq, op, list(args))
+
+    def apply_operation(self, op, args):
+        operations = {
+            "toggle_visibility":    lambda key: self.toggle_visibility(key),
+            "toggle_body":          lambda key: self.toggle_body(key),
+            "toggle_continue":      lambda key: self.toggle_continue(key),
+            "split_element":        lambda key: self.split_element(key),
+            "merge":                lambda page_number, key_list, concat_or_join: self.merge(page_number, key_list, concat_or_join),
+            "move_element":         lambda pivot_key, key_to_move, page_index, disposition: self.move_element(pivot_key, key_to_move, page_index, disposition),
+            "set_translation":      lambda key, text: self.set_translation(key, text),
+            "set_safe_margin":      lambda x1, y1, x2, y2: self.set_safe_margin(PdfRect(x1, y1, x2, y2)),
+        }
+        operations[op](*args)
+
+    def replay_journal(self):
+        self.journal_seq = self.context.journal_seq
+        records = [record for record in self.journal.read() if record[0] > self.context.journal_seq]
+
+        self.replaying = True
+        try:
+            with self.batch():
+                for seq, op, args in records:
+                    self.apply_operation(op, args)
+                    self.journal_seq = seq
+        finally:
+            self.replaying = False
+
+        if len(records) > 0:
+            print(f"Replayed {len(records)} edits from", self.journal.path)
+
     def save(self):
-        self.context.save_to_pickle(self.intm_path)
+        # edits are already in the journal, so only fold it into a new snapshot once it grows long enough
+        if self.journal.count >= global_config.JOURNAL_COMPACT_THRESHOLD:
+            self.compact()
+
+    def snapshot(self):
+        self.context.journal_seq = self.journal_seq
+        self.cache.save(self.context)
+
+    def compact(self):
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+
+        # serialize here, so that the background thread never sees a context in the middle of an edit
+        seq = self.journal_seq
+        self.context.journal_seq = seq
+        payload = ContextCache.serialize(self.context)
+
+        def write_snapshot():
+            self.cache.write(payload)
+            self.journal.compact(seq)
+
+        self.compactor = threading.Thread(target=write_snapshot)
+        self.compactor.start()
 
     def can_be_translated(self, key):
         if self.to_chain.get(key) is None:
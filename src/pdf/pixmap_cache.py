@@ -0,0 +1,96 @@
+import threading
+import fitz  # PyMuPDF
+from collections import OrderedDict
+from PIL import Image
+
+class PixmapCache:
+    """Renders pages from the PDF at the size they are shown and keeps the most recently used ones in memory.
+
+    The latest raster of a page is what previews are scaled from. Renders are also written to the page store,
+    if given, when they are at least STORE_GROWTH times wider than the stored one, so that later sessions can
+    show a preview without rasterizing the PDF. Pages are evicted in least recently used order once the decoded images exceed the
+    memory budget. The most recently used page is always kept, even if it alone exceeds the budget.
+    """
+    # the store is append-only, stored widths grow geometrically so the dead records stay below the live one in size
+    STORE_GROWTH = 1.5
+
+    def __init__(self, pdf_path, budget, store = None):
+        self.pdf_path = pdf_path
+        self.budget = budget        # in bytes
+        self.store = store
+
+        self.doc = None
+        self.images = OrderedDict()
+        self.size = 0
+
+        # fitz documents must not be used from several threads at once
+        self.lock = threading.Lock()
+
+    def render(self, page_number, extent):
+        # called with the lock held
+        if self.doc is None:
+            self.doc = fitz.open(self.pdf_path)
+        page = self.doc.load_page(page_number)
+        matrix = fitz.Matrix(extent[0] / page.rect.width, extent[1] / page.rect.height)
+        pix = page.get_pixmap(matrix=matrix, alpha=False)
+        return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+    def render_extent(self, page_number, extent):
+        """Rasterizes the page at exactly extent pixels, as sharp as the display allows.
+
+        The render replaces the page in memory, and the stored page if it is much larger, for the previews that follow.
+        """
+        with self.lock:
+            image = self.render(page_number, extent)
+            # the matrix can round to a pixel off the requested extent
+            if image.size != tuple(extent):
+                image = image.resize(extent, Image.BILINEAR)
+
+            previous = self.images.pop(page_number, None)
+            if previous is not None:
+                self.size -= PixmapCache.image_size(previous)
+            self.images[page_number] = image
+            self.size += PixmapCache.image_size(image)
+            self.evict()
+
+            if self.store is not None:
+                stored = self.store.get_size(page_number)
+                if stored is None or image.width >= stored[0] * PixmapCache.STORE_GROWTH:
+                    self.store.put(page_number, image)
+        return image
+
+    def get_preview(self, page_number, extent):
+        """A fast, approximate image of the page at extent, shown until the exact render is ready.
+
+        It is scaled from the page in memory or in the page store when there is one, otherwise rendered at a quarter of extent.
+        """
+        with self.lock:
+            image = self.images.get(page_number)
+            if image is None and self.store is not None:
+                image = self.store.get(page_number, extent)
+            if image is None:
+                image = self.render(page_number, (max(extent[0] // 4, 1), max(extent[1] // 4, 1)))
+        return image.resize(extent, Image.BILINEAR)
+
+    def evict(self):
+        while self.size > self.budget and len(self.images) > 1:
+            _, image = self.images.popitem(last=False)
+            self.size -= PixmapCache.image_size(image)
+
+    def clear(self):
+        with self.lock:
+            self.images.clear()
+            self.size = 0
+
+    def close(self):
+        self.clear()
+        with self.lock:
+            if self.doc is not None:
+                self.doc.close()
+                self.doc = None
+            if self.store is not None:
+                self.store.close()
+
+    @staticmethod
+    def image_size(image):
+        return image.width * image.height * len(image.getbands())
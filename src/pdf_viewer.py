@@ -1,18 +1,27 @@
 import tkinter as tk
 import threading
-import requests
 import os
+import time
 from functools import partial
 from tkinter import ttk
 from src.pdf.pdf import Pdf
 from src.canvas.pdf_canvas import PdfCanvas
+from src.text.pdf_text_view import PdfTextView
 from src.toolbar.pdf_viewer_toolbar import PdfViewerToolbar
 from src.toolbar.pdf_viewer_toolbar_item import PdfViewerToolbarItem
-from src.service.openai_completion_service import OpenAICompletionService, CompletionResult
-from src.service.prompt_manager import prompt_manager
+from src.service.openai_completion_service import CompletionResult
+from src.service.translation_service import TranslationService
+from src.service.document_translator import DocumentTranslator
+from src.service.request_scheduler import translation_executor
 from src.config import global_config
 
 class PDFViewer(tk.Frame):
+    # seconds of export work done per UI event loop iteration
+    EXPORT_SLICE = 0.02
+
+    # milliseconds between UI updates for arriving translations, at most 20 per second
+    TRANSLATION_UPDATE_INTERVAL = 50
+
     def __init__(self, pdf_path, intm_dir, export_dir, ignore_cache = False, master=None):
         super().__init__(master)
         self.master = master
@@ -35,6 +44,8 @@ class PDFViewer(tk.Frame):
         self.toolbar = PdfViewerToolbar(self)
         self.toolbar.bind("<<ToolbarButtonClicked>>", self.on_toolbar_button_clicked)
         self.toolbar.bind("<<ExportButtonClicked>>", self.on_export_button_clicked)
+        self.toolbar.bind("<<TranslatePageButtonClicked>>", self.on_translate_page_button_clicked)
+        self.toolbar.bind("<<TranslateAllButtonClicked>>", self.on_translate_all_button_clicked)
         for i in range(1, 6):
             self.master.bind(str(i), self.toolbar.key_press)
 
@@ -53,13 +64,13 @@ class PDFViewer(tk.Frame):
         self.master.bind("<Escape>", self.canvas.on_escape)
 
         # Initialize Text widget
-        self.text_widget = tk.Text(self.paned_window, font=(global_config.TEXT_FONT, global_config.TEXT_FONT_SIZE))
+        self.text_widget = PdfTextView(self.paned_window, font=(global_config.TEXT_FONT, global_config.TEXT_FONT_SIZE))
         self.text_widget.config(spacing3=7)
         self.text_widget.pack(fill="both", expand=True)
         self.paned_window.add(self.text_widget)
 
         # Add elements to the Text widget
-        self.add_elements_to_text_widget()
+        self.add_elements_to_text_widget(True)
 
         # Set the minimum size of the Text widget to 60% of the window width
         self.paned_window.update()
@@ -69,27 +80,42 @@ class PDFViewer(tk.Frame):
         self.toolbar.toggle_button(PdfViewerToolbarItem.SafeArea)
 
         self.translating = {}
+        self.exporting = None
 
-    def add_elements_to_text_widget(self):
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.delete('1.0', tk.END)  # Clear the text widget
-        self.text_widget.insert(tk.END, self.pdf.get_page_text(self.canvas.get_current_page()))
-        self.text_widget.config(state=tk.DISABLED)
+        # translations posted by worker threads, applied together on the next UI update
+        self.pending_translations = {}
+        self.pending_lock = threading.Lock()
+        self.translation_update_scheduled = False
+
+    def add_elements_to_text_widget(self, reset = False):
+        # only the ranges of the elements that changed are replaced, unless the page changed
+        self.text_widget.show_segments(self.pdf.get_page_segments(self.canvas.get_current_page()), reset)
 
     def on_page_changed_by_canvas(self, event):
-        self.add_elements_to_text_widget()
+        self.add_elements_to_text_widget(True)
 
     def redraw(self):
         self.canvas.redraw()
         self.add_elements_to_text_widget()
 
+    def edits_blocked(self):
+        # the export reads the document page by page between UI events, it must not change halfway
+        if self.exporting is not None:
+            print("Export in progress, edits are ignored until it is written")
+            return True
+        return False
+
     def on_safe_area_changed_by_canvas(self, event):
         if self.toolbar.get_current_selection() != PdfViewerToolbarItem.SafeArea:
             return
+        if self.edits_blocked():
+            # puts the dragged safe area back
+            self.redraw()
+            return
         
         new_safe_margin = self.canvas.get_new_safe_margin()
+        # edits rebuild their chains and save when they finish
         self.pdf.set_safe_margin(new_safe_margin)
-        self.pdf.save()
         self.redraw()
 
     def on_drag_end_by_canvas(self, event):
@@ -101,10 +127,11 @@ class PDFViewer(tk.Frame):
         }
 
         current_selection = self.toolbar.get_current_selection()
-        if current_selection in actions:
+        if current_selection in actions and not self.edits_blocked():
             action = actions[current_selection]
-            action(self.canvas.get_selected_elements())
-            self.pdf.save()
+            # chains are rebuilt and the edits saved once, for the whole selection
+            with self.pdf.batch():
+                action(self.canvas.get_selected_elements())
             self.redraw()
 
     def on_element_left_clicked_by_canvas(self, event):
@@ -119,11 +146,16 @@ class PDFViewer(tk.Frame):
             PdfViewerToolbarItem.Translate:     self.handle_translate
         }
 
-        if current_selection in actions:
-            actions[current_selection]()
-            self.pdf.save()
+        # translation requests only apply their result once the export is written
+        if current_selection in actions and (current_selection == PdfViewerToolbarItem.Translate or not self.edits_blocked()):
+            with self.pdf.batch():
+                actions[current_selection]()
             self.redraw()
 
+        # chain continuations show their text in the range of the chain head
+        head_key = self.pdf.to_chain.get(key)
+        self.text_widget.highlight(head_key if head_key is not None else key)
+
     def handle_order(self):
         key = self.canvas.get_clicked_element()
         if self.canvas.get_pivot() is None:
@@ -137,95 +169,121 @@ class PDFViewer(tk.Frame):
     def handle_translate(self):
         key, e, text = self.pdf.get_chained_text(self.canvas.get_clicked_element())
         if e is not None and e.can_be_translated() and not key in self.translating:
+            if TranslationService.get_provider() is None:
+                print("No translation API key provided")
+                return
+
+            # paid translations of the same text are reused, without a round trip
+            cached = TranslationService.get_cached_translation(text)
+            if cached is not None:
+                self.translating[key] = True
+                self.post_translation(key, cached, True)
+                return
 
-            def request_translation_deepl(key, text):
-                print("Requesting translation via RapidAPI DeepL...")
-
-                url = "https://deepl-translator.p.rapidapi.com/translate"
-
-                payload = {
-                    "text": text,
-                    "source": global_config.DEEPL_RAPID_API_SRC_LANG,
-                    "target": global_config.DEEPL_RAPID_API_DST_LANG
-                }
-                headers = {
-                    "content-type": "application/json",
-                    "X-RapidAPI-Key": global_config.DEEPL_RAPID_API_KEY,
-                    "X-RapidAPI-Host": global_config.DEEPL_RAPID_API_HOST
-                }
-
-                response = requests.post(url, json=payload, headers=headers)
-
-                if response.status_code == 200:
-                    self.master.after(0, update_ui, key, response.json()["text"], True)
-
-            def request_translation_openai(key, text):
-                print("Requesting translation via OpenAI...")
-                response = OpenAICompletionService.request_chat_completion(
-                    model="gpt-4",
-                    messages=[
-                        OpenAICompletionService.user_message(
-                            prompt_manager.generate_prompt(
-                                "translate",
-                                { 
-                                    "Text" : text, 
-                                })),
-                    ],
-                    temperature=0.0,
-                    stream=True, 
-                    stream_callback=partial(stream_callback, key),
-                    verbose_prompt=False,
-                    verbose_response=False)
-                
-                if response.status == CompletionResult.OK:
-                    self.master.after(0, update_ui, key, response.reply_text, True)
-
-            def stream_callback(key, result, content):
-                self.master.after(0, update_ui, key, result, False)
-
-            def update_ui(key, text, finished):
-                e = self.pdf.get_element(key)
-
-                if e is not None:
-                    need_to_redraw = e.translated is None
-                    e.translated = text
-                    if not finished:
-                        if e.page_number == self.canvas.get_current_page() + 1:
-                            if need_to_redraw:
-                                self.redraw()
-                            else:
-                                self.add_elements_to_text_widget()
-                    else:
-                        self.pdf.save()
-                        if e.page_number == self.canvas.get_current_page() + 1:
-                            self.redraw()
-                
-                if finished and key in self.translating:
-                    self.translating.pop(key)
+            def request_translation(key, text):
+                response = TranslationService.request_translation(text, partial(self.on_translation_streamed, key))
+                reply_text = response.reply_text if response.status == CompletionResult.OK else None
+                self.post_translation(key, reply_text, True)
 
             self.translating[key] = True
-            if global_config.DEEPL_RAPID_API_KEY is not None:
-                threading.Thread(target=request_translation_deepl, args=(key, text)).start()
-            elif global_config.OPENAI_API_KEY is not None:
-                threading.Thread(target=request_translation_openai, args=(key, text)).start()
-            else:
-                print("No translation API key provided")
+            translation_executor.submit(request_translation, key, text)
+
+    def on_translation_streamed(self, key, result, content):
+        self.post_translation(key, result, False)
+
+    def post_translation(self, key, text, finished):
+        """Queues a partial or finished translation, from any thread. Only the latest text of each element is kept."""
+        with self.pending_lock:
+            pending = self.pending_translations.get(key)
+            if pending is not None and pending[1] and not finished:
+                return
+            self.pending_translations[key] = (text, finished)
+
+            if self.translation_update_scheduled:
+                return
+            self.translation_update_scheduled = True
+        self.master.after(PDFViewer.TRANSLATION_UPDATE_INTERVAL, self.update_translations)
+
+    def update_translations(self):
+        if self.exporting is not None:
+            # kept pending, newer texts still replace older ones, until the export is written
+            self.master.after(PDFViewer.TRANSLATION_UPDATE_INTERVAL, self.update_translations)
+            return
+
+        with self.pending_lock:
+            pending = self.pending_translations
+            self.pending_translations = {}
+            self.translation_update_scheduled = False
+
+        current_page = self.canvas.get_current_page() + 1
+        text_changed = False
+        canvas_changed = False
+        saved = False
+
+        for key, (text, finished) in pending.items():
+            e = self.pdf.get_element(key)
+
+            # text is None when the translation failed
+            if e is not None and text is not None:
+                # partial results are not journaled, only the finished translation is
+                self.pdf.set_translation(key, text, finished)
+                saved = saved or finished
+                if e.page_number == current_page:
+                    text_changed = True
+                    # the canvas only shows whether an element is translated, so it waits for the finished text
+                    canvas_changed = canvas_changed or finished
+
+            if finished and key in self.translating:
+                self.translating.pop(key)
+
+        if saved:
+            self.pdf.save()
+        if canvas_changed:
+            self.redraw()
+        elif text_changed:
+            self.add_elements_to_text_widget()
+
+    def translate_pages(self, first_page, last_page):
+        if TranslationService.get_provider() is None:
+            print("No translation API key provided")
+            return
+
+        translator = DocumentTranslator(self.pdf)
+        targets = [(key, text) for key, text in translator.collect_targets(first_page, last_page) if key not in self.translating]
+        if len(targets) == 0:
+            return
+
+        for key, _ in targets:
+            self.translating[key] = True
+
+        def on_result(key, text):
+            self.post_translation(key, text, True)
+
+        threading.Thread(target=translator.run, args=(targets, on_result)).start()
+
+    def on_translate_page_button_clicked(self, event):
+        page = self.canvas.get_current_page()
+        self.translate_pages(page, page)
+
+    def on_translate_all_button_clicked(self, event):
+        self.translate_pages(0, self.pdf.get_page_number() - 1)
 
     def on_element_right_clicked_by_canvas(self, event):
+        if self.edits_blocked():
+            return
+
         if self.toolbar.get_current_selection() == PdfViewerToolbarItem.MergeAndSplit or self.toolbar.get_current_selection() == PdfViewerToolbarItem.JoinAndSplit:
             self.pdf.split_element(self.canvas.get_clicked_element())
-            self.pdf.save()
             self.redraw()
         elif self.toolbar.get_current_selection() == PdfViewerToolbarItem.Order:
             if self.pdf.move_element(self.canvas.get_pivot(), self.canvas.get_clicked_element(), self.canvas.get_current_page(), "before"):
-                self.pdf.save()
                 # it is very confusing, so we don't change the pivot
                 #self.canvas.set_pivot(self.canvas.get_clicked_element())
                 self.redraw()
         elif self.toolbar.get_current_selection() == PdfViewerToolbarItem.Translate:
             e = self.pdf.get_element(self.canvas.get_clicked_element())
             if e is not None:
-                e.translated = None
+                self.pdf.set_translation(self.canvas.get_clicked_element(), None)
                 self.pdf.save()
                 self.redraw()
 
@@ -233,8 +291,42 @@ class PDFViewer(tk.Frame):
         self.canvas.change_mode(self.toolbar.get_current_selection())
 
     def on_export_button_clicked(self, event):
-        text = self.pdf.get_text()
+        if self.exporting is not None:
+            return
+
         filename = os.path.splitext(os.path.basename(self.pdf_path))[0] + ".txt"
         pathname = os.path.join(self.export_dir, filename)
-        with open(pathname, 'w', encoding='utf-8') as file:
-            file.write(text)
\ No newline at end of file
+
+        # pages are written in short slices between UI events, into a temporary file that replaces the export at the end
+        self.exporting = (None, None, pathname)
+        self.export_step()
+
+    def export_step(self):
+        texts, file, pathname = self.exporting
+        deadline = time.perf_counter() + PDFViewer.EXPORT_SLICE
+
+        try:
+            if texts is None:
+                # read lazily, edits and translation updates wait until the export is written
+                texts = self.pdf.iter_text()
+                file = open(pathname + ".tmp", 'w', encoding='utf-8')
+                self.exporting = (texts, file, pathname)
+
+            for text in texts:
+                file.write(text)
+                if time.perf_counter() > deadline:
+                    self.master.after(1, self.export_step)
+                    return
+
+            file.close()
+            os.replace(pathname + ".tmp", pathname)
+        except Exception as e:
+            if file is not None:
+                file.close()
+            self.exporting = None
+            print("Export failed")
+            print(e)
+            return
+
+        self.exporting = None
+        print("Exported to", pathname)
\ No newline at end of file
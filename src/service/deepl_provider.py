@@ -0,0 +1,98 @@
+import json
+import asyncio
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from src.config import global_config
+from src.service.openai_completion_service import CompletionData, CompletionResult
+from src.service.request_scheduler import RequestScheduler
+from src.service.translation_provider import TranslationProvider
+
+class DeepLProvider(TranslationProvider):
+    name = "deepl"
+
+    def __init__(self):
+        super().__init__(RequestScheduler("DeepL", global_config.DEEPL_REQUESTS_PER_MINUTE))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=global_config.TRANSLATE_CONCURRENCY)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def cache_variant(self):
+        return ("deepl", global_config.DEEPL_RAPID_API_SRC_LANG, global_config.DEEPL_RAPID_API_DST_LANG)
+
+    @staticmethod
+    def make_payload(text):
+        return {
+            "text": text,
+            "source": global_config.DEEPL_RAPID_API_SRC_LANG,
+            "target": global_config.DEEPL_RAPID_API_DST_LANG
+        }
+
+    @staticmethod
+    def make_headers():
+        return {
+            "content-type": "application/json",
+            "X-RapidAPI-Key": global_config.DEEPL_RAPID_API_KEY or "",
+            "X-RapidAPI-Host": global_config.DEEPL_RAPID_API_HOST or ""
+        }
+
+    @staticmethod
+    def parse_response(status_code, headers, body) -> CompletionData:
+        if status_code == 200:
+            try:
+                return CompletionData(status=CompletionResult.OK, reply_text=json.loads(body)["text"])
+            except (ValueError, KeyError, TypeError) as e:
+                return CompletionData(status=CompletionResult.OTHER_ERROR, status_text=f"Unexpected DeepL response: {e}")
+
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+
+        status_text = f"DeepL returned {status_code}: {body[:200]}"
+        print(status_text)
+        if status_code == 429:
+            return CompletionData(status=CompletionResult.RATE_LIMITED, status_text=status_text, retry_after=retry_after)
+        elif status_code >= 500:
+            return CompletionData(status=CompletionResult.SERVER_ERROR, status_text=status_text, retry_after=retry_after)
+        elif status_code == 413:
+            return CompletionData(status=CompletionResult.TOO_LONG, status_text=status_text)
+        return CompletionData(status=CompletionResult.OTHER_ERROR, status_text=status_text)
+
+    def translate(self, text, stream_callback = None) -> CompletionData:
+        print("Requesting translation via RapidAPI DeepL...")
+
+        def post():
+            try:
+                response = self.session.post(
+                    global_config.DEEPL_API_URL, 
+                    json=DeepLProvider.make_payload(text), 
+                    headers=DeepLProvider.make_headers(), 
+                    timeout=global_config.DEEPL_TIMEOUT)
+            except requests.RequestException as e:
+                return CompletionData(status=CompletionResult.SERVER_ERROR, status_text=str(e))
+            return DeepLProvider.parse_response(response.status_code, response.headers, response.text)
+
+        return self.scheduler.run(post)
+
+    def make_async_session(self):
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=global_config.TRANSLATE_CONCURRENCY),
+            timeout=aiohttp.ClientTimeout(total=global_config.DEEPL_TIMEOUT))
+
+    async def translate_async(self, text) -> CompletionData:
+        session = self.get_async_session()
+
+        async def post():
+            try:
+                async with session.post(
+                    global_config.DEEPL_API_URL, 
+                    json=DeepLProvider.make_payload(text), 
+                    headers=DeepLProvider.make_headers()) as response:
+                    body = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return CompletionData(status=CompletionResult.SERVER_ERROR, status_text=str(e) or type(e).__name__)
+            return DeepLProvider.parse_response(response.status, response.headers, body)
+
+        return await self.scheduler.run_async(post)
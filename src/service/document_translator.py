@@ -0,0 +1,88 @@
+import asyncio
+from src.config import global_config
+from src.service.openai_completion_service import CompletionResult
+from src.service.request_packer import RequestPacker
+from src.service.translation_service import TranslationService
+
+class DocumentTranslator:
+    """Translates every chain head and standalone element of a page range, with a bounded number of requests in flight."""
+    def __init__(self, pdf, concurrency = None):
+        self.pdf = pdf
+        self.concurrency = concurrency if concurrency is not None else global_config.TRANSLATE_CONCURRENCY
+
+    def collect_targets(self, first_page = 0, last_page = None):
+        """Returns (key, text) of the untranslated chain heads and standalone elements, in document order."""
+        if last_page is None:
+            last_page = self.pdf.get_page_number() - 1
+
+        targets = []
+        for page in range(first_page, last_page + 1):
+            for key, element in self.pdf.iter_elements_page(page):
+                if not element.safe or not element.visible:
+                    continue
+
+                head_key = self.pdf.to_chain.get(key)
+                if head_key is None:
+                    if element.can_be_translated():
+                        targets.append((key, element.text))
+                elif head_key == key:
+                    head, text = self.pdf.chains[key]
+                    if head.can_be_translated():
+                        targets.append((key, text))
+        return targets
+
+    async def translate(self, targets, on_result):
+        """Calls on_result(key, translated text) as each translation arrives, or with None when it failed."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def translate_one(key, text):
+            async with semaphore:
+                response = await TranslationService.async_request_translation(text)
+            if response.status == CompletionResult.OK:
+                on_result(key, response.reply_text)
+                return 1
+            print(f"Translation of element {key} failed: {response.status.name}", response.status_text or "")
+            on_result(key, None)
+            return 0
+
+        async def translate_group(group):
+            if len(group) == 1:
+                return await translate_one(*group[0])
+
+            async with semaphore:
+                translations = await TranslationService.async_request_packed_translation([text for _, text in group])
+            if translations is None:
+                print(f"Packed translation of {len(group)} paragraphs could not be split, translating them one by one")
+                results = await asyncio.gather(*[translate_one(key, text) for key, text in group])
+                return sum(results)
+
+            for (key, _), translation in zip(group, translations):
+                on_result(key, translation)
+            return len(group)
+
+        pending = []
+        for key, text in targets:
+            cached = TranslationService.get_cached_translation(text)
+            if cached is not None:
+                on_result(key, cached)
+            else:
+                pending.append((key, text))
+
+        # providers without a packed prompt get one request per text, DeepL is billed by character anyway
+        if TranslationService.supports_packing():
+            groups = RequestPacker().pack(pending)
+        else:
+            groups = [[target] for target in pending]
+
+        try:
+            results = await asyncio.gather(*[translate_group(group) for group in groups])
+        finally:
+            await TranslationService.close_async()
+        return len(targets) - len(pending) + sum(results)
+
+    def run(self, targets, on_result):
+        """Blocking entry point, meant to be called from a worker thread or a batch process."""
+        print(f"Translating {len(targets)} paragraphs with up to {self.concurrency} concurrent requests...")
+        translated = asyncio.run(self.translate(targets, on_result))
+        print(f"Translated {translated} of {len(targets)} paragraphs")
+        return translated
@@ -0,0 +1,84 @@
+import os
+import re
+import requests
+from tqdm import tqdm
+from urllib.parse import urlparse
+
+def is_url(string):
+    try:
+        result = urlparse(string)
+        return all([result.scheme, result.netloc])
+    except ValueError:
+        return False
+
+def get_filename_from_url(url):
+    parsed_url = urlparse(url)
+    filename = os.path.basename(parsed_url.path)
+    return filename
+
+def download_file(url, destination):
+    response = requests.get(url, stream=True)
+
+    # Check if the request was successful
+    if response.status_code == 200:
+        total_size_in_bytes= int(response.headers.get('content-length', 0))
+
+        progress_bar = None
+        if total_size_in_bytes > 0:
+            progress_bar = tqdm(total=total_size_in_bytes, unit='iB', unit_scale=True)
+
+        with open(destination, 'wb') as file:
+            for chunk in response.iter_content(chunk_size=1024):
+                if progress_bar is not None:
+                    progress_bar.update(len(chunk))
+                file.write(chunk)
+
+        if progress_bar is not None:
+            progress_bar.close()
+
+        if total_size_in_bytes != 0 and progress_bar.n != total_size_in_bytes:
+            print("Error, something went wrong.")
+            os.remove(destination)
+            return False
+
+        print("File downloaded successfully in ", destination)
+        return True
+
+    else:
+        print("Failed to download file: ", response.status_code)
+        return False
+
+ARXIV_URL_PATTERN = re.compile(
+    r'^https?://(?:www\.)?(?:arxiv\.org/(?:abs|pdf)|huggingface\.co/papers)/(?P<id>[^?#]+?)(?:\.pdf)?/?(?:[?#].*)?$')
+
+def get_arxiv_pdf_url(url):
+    # abs, pdf and huggingface URLs of the same paper all map to the same PDF URL (and file name)
+    match = ARXIV_URL_PATTERN.match(url)
+    if match is None:
+        return None
+    return 'https://arxiv.org/pdf/' + match.group('id') + '.pdf'
+
+def try_download(url, intm_dir):
+
+    print("URL detected, trying to download file...")
+
+    # if arxiv or hugging face URL, download PDF instead
+    pdf_url = get_arxiv_pdf_url(url)
+    if pdf_url is not None and pdf_url != url:
+        print("Arxiv or Hugging Face URL detected, downloading PDF instead")
+        url = pdf_url
+
+    file_name = get_filename_from_url(url)
+    if file_name == "":
+        print("Failed to get filename from URL")
+        return None
+
+    path_name = os.path.join(intm_dir, file_name)
+
+    if os.path.isfile(path_name):
+        print(f"File '{path_name}' already exists, skipping download")
+    else:
+        if not download_file(url, path_name):
+            return None
+    
+    return path_name
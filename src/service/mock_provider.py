@@ -0,0 +1,53 @@
+import time
+import asyncio
+from src.config import global_config
+from src.service.openai_completion_service import CompletionData, CompletionResult
+from src.service.request_packer import RequestPacker
+from src.service.request_scheduler import RequestScheduler
+from src.service.translation_provider import TranslationProvider
+
+class MockProvider(TranslationProvider):
+    """Answers locally after MOCK_TRANSLATION_LATENCY seconds, for trying the translation flow without an API key."""
+    name = "mock"
+    supports_packing = True
+
+    def __init__(self):
+        super().__init__(RequestScheduler("Mock", 60000))
+
+    def cache_variant(self):
+        return ("mock", global_config.DEEPL_RAPID_API_DST_LANG)
+
+    @staticmethod
+    def mock_translation(text):
+        return f"[{global_config.DEEPL_RAPID_API_DST_LANG}] {text}"
+
+    def translate(self, text, stream_callback = None) -> CompletionData:
+        def request():
+            reply = MockProvider.mock_translation(text)
+            if stream_callback is None:
+                time.sleep(global_config.MOCK_TRANSLATION_LATENCY)
+            else:
+                # streamed word by word, spread over the same latency
+                words = reply.split(" ")
+                result = ""
+                for i, word in enumerate(words):
+                    time.sleep(global_config.MOCK_TRANSLATION_LATENCY / len(words))
+                    content = word if i == 0 else " " + word
+                    result += content
+                    stream_callback(result, content)
+            return CompletionData(status=CompletionResult.OK, reply_text=reply)
+
+        return self.scheduler.run(request)
+
+    async def reply_async(self, reply) -> CompletionData:
+        async def request():
+            await asyncio.sleep(global_config.MOCK_TRANSLATION_LATENCY)
+            return CompletionData(status=CompletionResult.OK, reply_text=reply)
+
+        return await self.scheduler.run_async(request)
+
+    async def translate_async(self, text) -> CompletionData:
+        return await self.reply_async(MockProvider.mock_translation(text))
+
+    async def translate_packed_async(self, texts) -> CompletionData:
+        return await self.reply_async(RequestPacker.join([MockProvider.mock_translation(text) for text in texts]))
@@ -0,0 +1,138 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockTranslationServer(ThreadingHTTPServer):
+    """Stands in for the DeepL (RapidAPI) and OpenAI chat completion endpoints, to measure throughput offline.
+
+    Point the application at it with DEEPL_API_URL=http://<host>:<port>/translate
+    or OPENAI_API_BASE=http://<host>:<port>/v1 (with any OPENAI_API_KEY).
+    """
+    daemon_threads = True
+
+    def __init__(self, address, latency = 0.2, requests_per_second = None, error_rate = 0.0):
+        super().__init__(address, MockTranslationHandler)
+        self.latency = latency
+        self.requests_per_second = requests_per_second
+        self.error_rate = error_rate
+        self.window = []
+        self.lock = threading.Lock()
+        self.served = 0
+
+    def admit(self):
+        """Returns False when the request goes over the configured rate and has to be answered with 429."""
+        if self.requests_per_second is None:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.window = [t for t in self.window if now - t < 1]
+            if len(self.window) >= self.requests_per_second:
+                return False
+            self.window.append(now)
+            return True
+
+    @staticmethod
+    def translate(text):
+        # marker lines of packed requests are kept as they are, every other line is "translated"
+        return "\n".join(line if re.fullmatch(r"\s*<<<\s*\d+\s*>>>\s*", line) or not line.strip() else "[KO] " + line for line in text.split("\n"))
+
+    @staticmethod
+    def prompt_text(messages):
+        content = messages[-1]["content"] if messages else ""
+        match = re.search(r"# Text\n(.*?)\n\n# Translation", content, re.DOTALL)
+        return match.group(1) if match is not None else content
+
+class MockTranslationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        for word in re.findall(r"\S+\s*", reply):
+            chunk = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        write_chunk(b"data: [DONE]\n\n")
+        write_chunk(b"")
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": {"message": "invalid json"}})
+            return
+
+        if not server.admit():
+            self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {"Retry-After": "1"})
+            return
+
+        time.sleep(server.latency)
+        if random.random() < server.error_rate:
+            self.send_json(503, {"error": {"message": "The server is overloaded", "type": "server_error"}})
+            return
+
+        with server.lock:
+            server.served += 1
+
+        if self.path.rstrip("/").endswith("/translate"):
+            self.send_json(200, {"text": MockTranslationServer.translate(body.get("text", ""))})
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            reply = MockTranslationServer.translate(MockTranslationServer.prompt_text(body.get("messages", [])))
+            if body.get("stream"):
+                self.send_stream(reply)
+            else:
+                self.send_json(200, {
+                    "id": "mock", 
+                    "object": "chat.completion", 
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+        else:
+            self.send_json(404, {"error": {"message": f"unknown endpoint {self.path}"}})
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the translation APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each answer")
+    parser.add_argument("--rps", type=int, default=None, help="requests per second before answering 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    server = MockTranslationServer((args.host, args.port), args.latency, args.rps, args.error_rate)
+    print(f"Mock translation server on http://{args.host}:{args.port} (DeepL: /translate, OpenAI: /v1/chat/completions)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.served} requests")
+
+if __name__ == "__main__":
+    main()
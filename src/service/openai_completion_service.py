@@ -8,6 +8,8 @@ import openai
 
 # Set up OpenAI API configuration
 openai.api_key = global_config.OPENAI_API_KEY
+if global_config.OPENAI_API_BASE is not None:
+    openai.api_base = global_config.OPENAI_API_BASE
 
 class CompletionResult(Enum):
     OK = 0
@@ -17,6 +19,7 @@ class CompletionResult(Enum):
     MODERATION_FLAGGED = 4
     MODERATION_BLOCKED = 5
     RATE_LIMITED = 6
+    SERVER_ERROR = 7
 
 @dataclass
 class CompletionData:
@@ -25,6 +28,7 @@ class CompletionData:
     status_text: Optional[str] = None
     prompt_tokens: Optional[int] = None
     completion_tokens: Optional[int] = None
+    retry_after: Optional[float] = None
 
 class OpenAICompletionService:
     @staticmethod
@@ -39,6 +43,14 @@ class OpenAICompletionService:
     def assistant_message(str:str):
         return { "role": "assistant", "content": str }
     
+    @staticmethod
+    def get_retry_after(e):
+        headers = getattr(e, "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+
     @staticmethod
     def dump_prompt(messages):
         for message in messages:
@@ -76,6 +88,7 @@ class OpenAICompletionService:
         top_p=None, 
         stop=None, 
         stream=False,
+        request_timeout=None,
         verbose_prompt=False, 
         verbose_response=False) -> CompletionData:
 
@@ -99,6 +112,7 @@ class OpenAICompletionService:
                     top_p=top_p,
                     stop=stop,
                     stream=True,
+                    request_timeout=request_timeout,
                 ):
                     content = chunk["choices"][0].get("delta", {}).get("content")
 
@@ -127,7 +141,8 @@ class OpenAICompletionService:
                     max_tokens=max_tokens,
                     temperature=temperature,
                     top_p=top_p,
-                    stop=stop
+                    stop=stop,
+                    request_timeout=request_timeout
                 )
 
                 response = CompletionData(
@@ -147,7 +162,17 @@ class OpenAICompletionService:
 
         except openai.error.RateLimitError as e:
             logger.exception(e)
-            return CompletionData(status=CompletionResult.RATE_LIMITED, status_text=str(e))
+            return CompletionData(
+                status=CompletionResult.RATE_LIMITED, 
+                status_text=str(e), 
+                retry_after=OpenAICompletionService.get_retry_after(e))
+
+        except (openai.error.APIError, openai.error.Timeout, openai.error.APIConnectionError, openai.error.ServiceUnavailableError) as e:
+            logger.exception(e)
+            return CompletionData(
+                status=CompletionResult.SERVER_ERROR, 
+                status_text=str(e), 
+                retry_after=OpenAICompletionService.get_retry_after(e))
 
         except openai.error.InvalidRequestError as e:
             if "This model's maximum context length" in e.user_message:
@@ -174,6 +199,7 @@ class OpenAICompletionService:
         stop=None, 
         stream=False,
         stream_callback=None,
+        request_timeout=None,
         verbose_prompt=False, 
         verbose_response=False) -> CompletionData:
 
@@ -197,6 +223,7 @@ class OpenAICompletionService:
                     top_p=top_p,
                     stop=stop,
                     stream=True,
+                    request_timeout=request_timeout,
                 ):
                     content = chunk["choices"][0].get("delta", {}).get("content")
 
@@ -228,7 +255,8 @@ class OpenAICompletionService:
                     max_tokens=max_tokens,
                     temperature=temperature,
                     top_p=top_p,
-                    stop=stop
+                    stop=stop,
+                    request_timeout=request_timeout
                 )
 
                 response = CompletionData(
@@ -248,7 +276,17 @@ class OpenAICompletionService:
 
         except openai.error.RateLimitError as e:
             logger.exception(e)
-            return CompletionData(status=CompletionResult.RATE_LIMITED, status_text=str(e))
+            return CompletionData(
+                status=CompletionResult.RATE_LIMITED, 
+                status_text=str(e), 
+                retry_after=OpenAICompletionService.get_retry_after(e))
+
+        except (openai.error.APIError, openai.error.Timeout, openai.error.APIConnectionError, openai.error.ServiceUnavailableError) as e:
+            logger.exception(e)
+            return CompletionData(
+                status=CompletionResult.SERVER_ERROR, 
+                status_text=str(e), 
+                retry_after=OpenAICompletionService.get_retry_after(e))
 
         except openai.error.InvalidRequestError as e:
             if "This model's maximum context length" in e.user_message:
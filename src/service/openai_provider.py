@@ -0,0 +1,99 @@
+import hashlib
+import aiohttp
+import openai
+from src.config import global_config
+from src.service.openai_completion_service import OpenAICompletionService, CompletionData
+from src.service.prompt_manager import prompt_manager
+from src.service.request_packer import RequestPacker
+from src.service.request_scheduler import RequestScheduler
+from src.service.token_counter import token_counter
+from src.service.translation_provider import TranslationProvider
+
+class OpenAIProvider(TranslationProvider):
+    name = "openai"
+    supports_packing = True
+
+    def __init__(self):
+        super().__init__(RequestScheduler("OpenAI", global_config.OPENAI_REQUESTS_PER_MINUTE, global_config.OPENAI_TOKENS_PER_MINUTE))
+
+    def cache_variant(self):
+        # a cached translation may come from either prompt, packed texts are translated with translate_batch
+        digest = hashlib.sha256()
+        for name in ("translate", "translate_batch"):
+            digest.update(prompt_manager.load_prompt(name).encode("utf-8"))
+            digest.update(b"\0")
+        return ("openai", global_config.OPENAI_MODEL, digest.hexdigest())
+
+    @staticmethod
+    def translation_messages(text):
+        return [
+            OpenAICompletionService.user_message(
+                prompt_manager.generate_prompt(
+                    "translate",
+                    { 
+                        "Text" : text, 
+                    })),
+        ]
+
+    @staticmethod
+    def batch_translation_messages(texts):
+        return [
+            OpenAICompletionService.user_message(
+                prompt_manager.generate_prompt(
+                    "translate_batch",
+                    { 
+                        "Text" : RequestPacker.join(texts), 
+                    })),
+        ]
+
+    @staticmethod
+    def estimate_tokens(messages, text):
+        # what the request takes from the tokens-per-minute budget, with the reply at twice the source
+        model = global_config.OPENAI_MODEL
+        return token_counter.count_messages(messages, model) + 2 * token_counter.count(text, model)
+
+    def max_text_tokens(self):
+        # the reply is budgeted at twice the source, Korean takes more tokens than English
+        model = global_config.OPENAI_MODEL
+        overhead = token_counter.count_messages(OpenAIProvider.translation_messages(""), model)
+        return max((token_counter.context_window(model) - overhead) // 3, 1)
+
+    def translate(self, text, stream_callback = None) -> CompletionData:
+        # the openai package keeps a keep-alive requests.Session per thread for blocking calls
+        print("Requesting translation via OpenAI...")
+        messages = OpenAIProvider.translation_messages(text)
+        return self.scheduler.run(
+            lambda: OpenAICompletionService.request_chat_completion(
+                model=global_config.OPENAI_MODEL,
+                messages=messages,
+                temperature=0.0,
+                stream=stream_callback is not None, 
+                stream_callback=stream_callback,
+                request_timeout=global_config.OPENAI_TIMEOUT,
+                verbose_prompt=False,
+                verbose_response=False),
+            OpenAIProvider.estimate_tokens(messages, text))
+
+    def make_async_session(self):
+        return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=global_config.TRANSLATE_CONCURRENCY))
+
+    async def request_async(self, messages, text) -> CompletionData:
+        async def request():
+            # without a session set, the openai package opens a new connection for every async request
+            token = openai.aiosession.set(self.get_async_session())
+            try:
+                return await OpenAICompletionService.async_request_chat_completion(
+                    model=global_config.OPENAI_MODEL,
+                    messages=messages,
+                    temperature=0.0,
+                    request_timeout=global_config.OPENAI_TIMEOUT)
+            finally:
+                openai.aiosession.reset(token)
+
+        return await self.scheduler.run_async(request, OpenAIProvider.estimate_tokens(messages, text))
+
+    async def translate_async(self, text) -> CompletionData:
+        return await self.request_async(OpenAIProvider.translation_messages(text), text)
+
+    async def translate_packed_async(self, texts) -> CompletionData:
+        return await self.request_async(OpenAIProvider.batch_translation_messages(texts), "".join(texts))
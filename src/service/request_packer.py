@@ -0,0 +1,68 @@
+import re
+from src.config import global_config
+from src.service.token_counter import token_counter
+
+class RequestPacker:
+    """Groups short texts into one translation request and splits the reply back onto them.
+
+    Every text is preceded by a numbered marker line; the reply is accepted only if it carries
+    each marker exactly once, in order, with a non-empty translation after it.
+    """
+    MARKER_PATTERN = re.compile(r"^[ \t]*<<<[ \t]*(\d+)[ \t]*>>>[ \t]*$", re.MULTILINE)
+
+    def __init__(self, model = None, budget = None, item_limit = None):
+        self.model = model if model is not None else global_config.OPENAI_MODEL
+        self.budget = budget if budget is not None else global_config.TRANSLATE_PACK_TOKENS
+        self.item_limit = item_limit if item_limit is not None else global_config.TRANSLATE_PACK_ITEM_TOKENS
+
+    @staticmethod
+    def marker(index):
+        return f"<<<{index + 1}>>>"
+
+    def pack(self, targets):
+        """Splits (key, text) targets into groups, a group of one is translated with the plain prompt."""
+        groups = []
+        group = []
+        group_tokens = 0
+
+        for key, text in targets:
+            tokens = token_counter.count(text, self.model)
+            if tokens > self.item_limit:
+                groups.append([(key, text)])
+                continue
+
+            # the marker line costs a few tokens of its own
+            tokens += 4
+            if group and group_tokens + tokens > self.budget:
+                groups.append(group)
+                group = []
+                group_tokens = 0
+            group.append((key, text))
+            group_tokens += tokens
+
+        if group:
+            groups.append(group)
+        return groups
+
+    @staticmethod
+    def join(texts):
+        return "\n\n".join(f"{RequestPacker.marker(i)}\n{text.strip()}" for i, text in enumerate(texts))
+
+    @staticmethod
+    def split(reply, count):
+        """Returns one translation per packed text, or None when the reply does not match the markers."""
+        if reply is None:
+            return None
+
+        matches = list(RequestPacker.MARKER_PATTERN.finditer(reply))
+        if [int(match.group(1)) for match in matches] != list(range(1, count + 1)):
+            return None
+
+        translations = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(reply)
+            translation = reply[match.end():end].strip()
+            if not translation:
+                return None
+            translations.append(translation)
+        return translations
@@ -0,0 +1,170 @@
+import time
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.config import global_config
+from src.service.openai_completion_service import CompletionData, CompletionResult
+
+class TokenBucket:
+    """Refills capacity per minute; a reservation may overdraw it, the caller then waits for the debt to refill."""
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.available = per_minute
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Takes amount from the bucket and returns how many seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # a single request larger than the bucket only has to wait for a full bucket
+            amount = min(amount, self.capacity)
+            self.available -= amount
+            return -self.available / self.rate if self.available < 0 else 0
+
+class CircuitBreaker:
+    """Opens after consecutive failures and holds requests back until the cooldown passed; then lets one trial through."""
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def wait_time(self):
+        """Returns 0 when a request may go out now, otherwise the seconds to hold it back."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            if self.trial:
+                return self.cooldown
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+            self.trial = True
+            return 0
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"Too many failed translation requests, pausing requests for {self.cooldown}s")
+                self.opened_at = time.monotonic()
+                self.trial = False
+
+class RequestScheduler:
+    """Rate limits, retries and circuit-breaks the requests sent to one translation provider.
+
+    A request is a callable returning CompletionData (or a coroutine of one for run_async).
+    RATE_LIMITED and SERVER_ERROR results are retried with exponential backoff and jitter,
+    waiting at least as long as the provider's retry_after asked for. While the circuit is open,
+    waiting for it uses up retries too, so a provider that stays down fails every request in the end.
+    """
+    RETRYABLE = (CompletionResult.RATE_LIMITED, CompletionResult.SERVER_ERROR)
+
+    # the fraction of the provider's limits this process may use, set when several processes translate at once
+    share = 1
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute = None):
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute * RequestScheduler.share)
+        self.token_bucket = TokenBucket(tokens_per_minute * RequestScheduler.share) if tokens_per_minute is not None else None
+        self.breaker = CircuitBreaker(global_config.TRANSLATE_BREAKER_THRESHOLD, global_config.TRANSLATE_BREAKER_COOLDOWN)
+        self.max_retries = global_config.TRANSLATE_MAX_RETRIES
+
+    def reserve(self, tokens):
+        wait = self.request_bucket.reserve(1)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        return wait
+
+    def backoff(self, attempt, response):
+        # full jitter over an exponentially growing window, never shorter than retry-after
+        delay = random.uniform(0, min(global_config.TRANSLATE_BACKOFF_MAX, global_config.TRANSLATE_BACKOFF_BASE * 2 ** attempt))
+        if response.retry_after is not None:
+            delay = max(delay, response.retry_after)
+        return delay
+
+    def circuit_open(self):
+        return CompletionData(status=CompletionResult.OTHER_ERROR, status_text=f"{self.name} requests are paused after repeated failures")
+
+    def hold(self, attempt):
+        """Returns the seconds to wait for the circuit, 0 to go ahead, or None when the request gives up."""
+        wait = self.breaker.wait_time()
+        if wait > 0 and attempt >= self.max_retries:
+            return None
+        return wait + random.uniform(0, 1) if wait > 0 else 0
+
+    def settle(self, attempt, response):
+        """Records the outcome and returns the delay before a retry, or None when response is final."""
+        if response.status not in RequestScheduler.RETRYABLE:
+            self.breaker.record_success()
+            return None
+
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+
+        delay = self.backoff(attempt, response)
+        print(f"{self.name} request failed ({response.status.name}), retrying in {delay:.1f}s")
+        return delay
+
+    def run(self, request, tokens = 1) -> CompletionData:
+        attempt = 0
+        while True:
+            hold = self.hold(attempt)
+            if hold is None:
+                return self.circuit_open()
+            elif hold > 0:
+                time.sleep(hold)
+                attempt += 1
+                continue
+
+            wait = self.reserve(tokens)
+            if wait > 0:
+                time.sleep(wait)
+
+            response = request()
+            delay = self.settle(attempt, response)
+            if delay is None:
+                return response
+            time.sleep(delay)
+            attempt += 1
+
+    async def run_async(self, request, tokens = 1) -> CompletionData:
+        attempt = 0
+        while True:
+            hold = self.hold(attempt)
+            if hold is None:
+                return self.circuit_open()
+            elif hold > 0:
+                await asyncio.sleep(hold)
+                attempt += 1
+                continue
+
+            wait = self.reserve(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            response = await request()
+            delay = self.settle(attempt, response)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+# bounded pool for interactive translation requests, in place of a thread per click
+translation_executor = ThreadPoolExecutor(max_workers=global_config.TRANSLATE_CONCURRENCY, thread_name_prefix="translation")
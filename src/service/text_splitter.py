@@ -0,0 +1,73 @@
+import re
+from src.service.token_counter import token_counter
+
+class TextSplitter:
+    """Splits text into segments under a token limit, preferring line, then sentence, then word boundaries."""
+    SEPARATORS = [
+        re.compile(r"\n+"),
+        re.compile(r"(?<=[.!?;:])\s+"),
+        re.compile(r"\s+"),
+    ]
+
+    @staticmethod
+    def split(text, max_tokens, model):
+        """Returns (segment, separator) pairs; joining every segment with the separator after it restores the text.
+
+        Segments are never blank: whitespace between them goes into the separators, leading whitespace into the first segment.
+        """
+        if not text.strip():
+            return []
+        return TextSplitter.split_level(text, max_tokens, model, 0)
+
+    @staticmethod
+    def split_level(text, max_tokens, model, level):
+        if token_counter.count(text, model) <= max_tokens or level >= len(TextSplitter.SEPARATORS):
+            return [(text, "")]
+
+        pieces = []
+        leading = ""
+        position = 0
+        bounds = [match.span() for match in TextSplitter.SEPARATORS[level].finditer(text)] + [(len(text), len(text))]
+        for start, end in bounds:
+            piece, separator = text[position:start], text[start:end]
+            position = end
+            if piece.strip():
+                pieces.append((leading + piece, separator))
+                leading = ""
+            elif pieces:
+                # blank pieces are only whitespace between the pieces around them
+                pieces[-1] = (pieces[-1][0], pieces[-1][1] + piece + separator)
+            else:
+                leading += piece + separator
+
+        segments = []
+        current = ""
+        current_separator = ""
+        for piece, separator in pieces:
+            if token_counter.count(piece, model) > max_tokens:
+                # a single piece over the limit is broken up at the next finer boundary
+                if current:
+                    segments.append((current, current_separator))
+                    current = ""
+                finer = TextSplitter.split_level(piece, max_tokens, model, level + 1)
+                segments.extend(finer[:-1])
+                segments.append((finer[-1][0], finer[-1][1] + separator))
+                continue
+
+            candidate = current + current_separator + piece if current else piece
+            if current and token_counter.count(candidate, model) > max_tokens:
+                segments.append((current, current_separator))
+                candidate = piece
+            current = candidate
+            current_separator = separator
+
+        if current:
+            segments.append((current, current_separator))
+        return segments
+
+    @staticmethod
+    def join(translations, separators):
+        # line breaks are kept, any other whitespace between segments becomes a single space
+        return "".join(
+            translation + ("\n" if "\n" in separator else " " if separator else "")
+            for translation, separator in zip(translations, separators)).strip()
@@ -0,0 +1,62 @@
+from src.config import global_config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+class TokenCounter:
+    """Counts tokens with tiktoken when it is installed, otherwise estimates them from the text length."""
+    # a conservative estimate, Korean and symbol-heavy text runs shorter than English per token
+    CHARS_PER_TOKEN = 3
+
+    # context window by model name prefix, the longest matching prefix wins
+    CONTEXT_WINDOWS = {
+        "gpt-3.5-turbo": 4096,
+        "gpt-3.5-turbo-16k": 16384,
+        "gpt-3.5-turbo-1106": 16385,
+        "gpt-3.5-turbo-0125": 16385,
+        "gpt-4": 8192,
+        "gpt-4-32k": 32768,
+        "gpt-4-turbo": 128000,
+        "gpt-4-1106": 128000,
+        "gpt-4-0125": 128000,
+        "gpt-4o": 128000,
+        "gpt-4.1": 1047576,
+    }
+    DEFAULT_CONTEXT_WINDOW = 4096
+
+    def __init__(self):
+        self.encodings = {}
+
+    def get_encoding(self, model):
+        if tiktoken is None:
+            return None
+        if model not in self.encodings:
+            try:
+                self.encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return self.encodings[model]
+
+    def count(self, text, model):
+        encoding = self.get_encoding(model)
+        if encoding is None:
+            return len(text) // TokenCounter.CHARS_PER_TOKEN + 1
+        return len(encoding.encode(text))
+
+    @staticmethod
+    def context_window(model):
+        if global_config.OPENAI_CONTEXT_WINDOW is not None:
+            return global_config.OPENAI_CONTEXT_WINDOW
+        prefixes = [prefix for prefix in TokenCounter.CONTEXT_WINDOWS if model.startswith(prefix)]
+        if not prefixes:
+            return TokenCounter.DEFAULT_CONTEXT_WINDOW
+        return TokenCounter.CONTEXT_WINDOWS[max(prefixes, key=len)]
+
+    def count_messages(self, messages, model):
+        # every message carries a few tokens of framing besides its content
+        return sum(self.count(message["content"], model) + 4 for message in messages) + 3
+
+# Create a global instance of TokenCounter
+token_counter = TokenCounter()
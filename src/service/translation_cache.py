@@ -0,0 +1,68 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+from src.config import global_config
+
+class TranslationCache:
+    """Persistent store of finished translations, shared by every document.
+
+    Entries are keyed by a hash of the normalized source text together with the provider's cache_variant,
+    everything else that changes the result: model and prompt template for OpenAI, languages for DeepL.
+    """
+    def __init__(self, path = None):
+        self.path = path
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        # called with the lock held; the database is opened on first use, in CACHE_DIR unless a path was given
+        if self.connection is None:
+            if self.path is None:
+                cache_dir = os.path.abspath(global_config.CACHE_DIR)
+                os.makedirs(cache_dir, exist_ok=True)
+                self.path = os.path.join(cache_dir, "translations.sqlite3")
+
+            # requests finish on worker threads and event loops, so the connection is shared under the lock
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            with self.connection:
+                self.connection.execute("PRAGMA journal_mode=WAL")
+                self.connection.execute(
+                    "CREATE TABLE IF NOT EXISTS translations (key TEXT PRIMARY KEY, source TEXT NOT NULL, translated TEXT NOT NULL)")
+        return self.connection
+
+    @staticmethod
+    def normalize(text):
+        return re.sub(r"\s+", " ", text).strip()
+
+    @staticmethod
+    def make_key(text, provider):
+        digest = hashlib.sha256()
+        digest.update("\0".join(str(v) for v in provider.cache_variant()).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(TranslationCache.normalize(text).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, text, provider):
+        key = TranslationCache.make_key(text, provider)
+        with self.lock:
+            row = self.connect().execute("SELECT translated FROM translations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, text, provider, translated):
+        key = TranslationCache.make_key(text, provider)
+        with self.lock:
+            with self.connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO translations (key, source, translated) VALUES (?, ?, ?)",
+                    (key, text, translated))
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+# Create a global instance of TranslationCache
+translation_cache = TranslationCache()
@@ -0,0 +1,50 @@
+import asyncio
+from src.service.openai_completion_service import CompletionData, CompletionResult
+
+class TranslationProvider:
+    """A translation backend; every request it sends goes through its own RequestScheduler.
+
+    Providers keep their HTTP connections alive: a pooled requests.Session for the blocking calls
+    and one aiohttp session per event loop for the async ones, closed by close_async.
+    """
+    name = None
+    supports_packing = False
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.async_sessions = {}
+
+    def cache_variant(self):
+        """Everything besides the text that changes the translation, part of the translation cache key."""
+        raise NotImplementedError
+
+    def max_text_tokens(self):
+        """The largest text a single request can take, or None when there is no known limit."""
+        return None
+
+    def translate(self, text, stream_callback = None) -> CompletionData:
+        raise NotImplementedError
+
+    async def translate_async(self, text) -> CompletionData:
+        raise NotImplementedError
+
+    async def translate_packed_async(self, texts) -> CompletionData:
+        """Translates several texts in one request, the reply carries the RequestPacker markers."""
+        return CompletionData(status=CompletionResult.INVALID_REQUEST, status_text=f"{self.name} does not support packed requests")
+
+    def make_async_session(self):
+        raise NotImplementedError
+
+    def get_async_session(self):
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        session = self.async_sessions.get(loop)
+        if session is None or session.closed:
+            session = self.make_async_session()
+            self.async_sessions[loop] = session
+        return session
+
+    async def close_async(self):
+        session = self.async_sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
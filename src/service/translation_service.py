@@ -0,0 +1,176 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from src.config import global_config
+from src.service.openai_completion_service import CompletionData, CompletionResult
+from src.service.request_packer import RequestPacker
+from src.service.text_splitter import TextSplitter
+from src.service.token_counter import token_counter
+from src.service.translation_cache import translation_cache
+from src.service.deepl_provider import DeepLProvider
+from src.service.openai_provider import OpenAIProvider
+from src.service.mock_provider import MockProvider
+
+class TranslationService:
+    PROVIDERS = {
+        "deepl": DeepLProvider,
+        "openai": OpenAIProvider,
+        "mock": MockProvider,
+    }
+
+    # providers are created on first use and shared, so their connection pools are too
+    providers = {}
+
+    @staticmethod
+    def get_provider_name():
+        if global_config.TRANSLATION_PROVIDER is not None:
+            return global_config.TRANSLATION_PROVIDER.lower()
+        elif global_config.DEEPL_RAPID_API_KEY is not None:
+            return "deepl"
+        elif global_config.OPENAI_API_KEY is not None:
+            return "openai"
+        return None
+
+    @staticmethod
+    def get_provider():
+        name = TranslationService.get_provider_name()
+        if name not in TranslationService.PROVIDERS:
+            if name is not None:
+                print(f"Unknown translation provider {name}")
+            return None
+
+        if name not in TranslationService.providers:
+            TranslationService.providers[name] = TranslationService.PROVIDERS[name]()
+        return TranslationService.providers[name]
+
+    @staticmethod
+    def no_provider():
+        return CompletionData(status=CompletionResult.OTHER_ERROR, status_text="No translation API key provided")
+
+    @staticmethod
+    def split_for_context(provider, text, response = None):
+        """Splits text that cannot fit the provider's request limit, or that it rejected as too long.
+
+        Returns the (segment, separator) pairs, or None when the text is sent as it is.
+        """
+        model = global_config.OPENAI_MODEL
+        if response is None:
+            max_tokens = provider.max_text_tokens()
+            if max_tokens is None:
+                return None
+        elif response.status == CompletionResult.TOO_LONG:
+            # the estimate was off, so the text is halved until it goes through
+            max_tokens = token_counter.count(text, model) // 2
+        else:
+            return None
+
+        segments = TextSplitter.split(text, max_tokens, model)
+        return segments if len(segments) > 1 else None
+
+    @staticmethod
+    def join_segments(segments, responses) -> CompletionData:
+        for response in responses:
+            if response.status != CompletionResult.OK:
+                return response
+        print(f"Translated a long text in {len(segments)} segments")
+        return CompletionData(
+            status=CompletionResult.OK,
+            reply_text=TextSplitter.join([response.reply_text for response in responses], [separator for _, separator in segments]))
+
+    @staticmethod
+    def translate_segments(provider, text, stream_callback = None) -> CompletionData:
+        segments = TranslationService.split_for_context(provider, text)
+        if segments is None:
+            response = provider.translate(text, stream_callback)
+            segments = TranslationService.split_for_context(provider, text, response)
+            if segments is None:
+                return response
+
+        # segments are translated in parallel without streaming, and stitched back in order
+        with ThreadPoolExecutor(max_workers=min(len(segments), global_config.TRANSLATE_CONCURRENCY)) as executor:
+            responses = list(executor.map(
+                lambda segment: TranslationService.translate_segments(provider, segment), 
+                [segment for segment, _ in segments]))
+        return TranslationService.join_segments(segments, responses)
+
+    @staticmethod
+    async def async_translate_segments(provider, text) -> CompletionData:
+        segments = TranslationService.split_for_context(provider, text)
+        if segments is None:
+            response = await provider.translate_async(text)
+            segments = TranslationService.split_for_context(provider, text, response)
+            if segments is None:
+                return response
+
+        responses = await asyncio.gather(*[TranslationService.async_translate_segments(provider, segment) for segment, _ in segments])
+        return TranslationService.join_segments(segments, responses)
+
+    @staticmethod
+    def get_cached_translation(text):
+        provider = TranslationService.get_provider()
+        return translation_cache.get(text, provider) if provider is not None else None
+
+    @staticmethod
+    def cache_translation(text, provider, response):
+        if response.status == CompletionResult.OK and response.reply_text:
+            translation_cache.put(text, provider, response.reply_text)
+        return response
+
+    @staticmethod
+    def request_translation(text, stream_callback = None) -> CompletionData:
+        """Translates text with the configured provider. stream_callback(result, content) is called as the reply streams in, if the provider streams."""
+        provider = TranslationService.get_provider()
+        if provider is None:
+            return TranslationService.no_provider()
+
+        cached = translation_cache.get(text, provider)
+        if cached is not None:
+            return CompletionData(status=CompletionResult.OK, reply_text=cached)
+
+        response = TranslationService.translate_segments(provider, text, stream_callback)
+        return TranslationService.cache_translation(text, provider, response)
+
+    @staticmethod
+    async def async_request_translation(text) -> CompletionData:
+        provider = TranslationService.get_provider()
+        if provider is None:
+            return TranslationService.no_provider()
+
+        cached = translation_cache.get(text, provider)
+        if cached is not None:
+            return CompletionData(status=CompletionResult.OK, reply_text=cached)
+
+        response = await TranslationService.async_translate_segments(provider, text)
+        return TranslationService.cache_translation(text, provider, response)
+
+    @staticmethod
+    def supports_packing():
+        provider = TranslationService.get_provider()
+        return provider is not None and provider.supports_packing
+
+    @staticmethod
+    async def async_request_packed_translation(texts):
+        """Translates several short texts with one request.
+
+        Returns the translations in order, or None when the request failed or the reply could not be split,
+        in which case the caller falls back to one request per text.
+        """
+        provider = TranslationService.get_provider()
+        if provider is None or not provider.supports_packing:
+            return None
+
+        response = await provider.translate_packed_async(texts)
+        if response.status != CompletionResult.OK:
+            return None
+
+        translations = RequestPacker.split(response.reply_text, len(texts))
+        if translations is not None:
+            # stored under the per-text key, a packed translation answers later single requests as well
+            for text, translation in zip(texts, translations):
+                translation_cache.put(text, provider, translation)
+        return translations
+
+    @staticmethod
+    async def close_async():
+        """Closes the async connections opened on the running event loop, before it goes away."""
+        for provider in TranslationService.providers.values():
+            await provider.close_async()
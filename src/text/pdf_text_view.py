@@ -0,0 +1,85 @@
+import tkinter as tk
+
+class PdfTextView(tk.Text):
+    """Read-only text of the current page, kept as one range per element so that a change replaces only its range.
+
+    Each segment starts at a mark named after its position; a segment ends where the next one starts.
+    """
+    def __init__(self, master=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.tag_configure("highlight", background="light yellow")
+        self.config(state=tk.DISABLED)
+
+        self.segments = []      # (key, text) as shown
+        self.positions = {}     # key -> index into segments
+
+    def mark_name(self, position):
+        return f"segment_{position}"
+
+    def segment_range(self, position):
+        start = self.index(self.mark_name(position))
+        end = self.index(self.mark_name(position + 1)) if position + 1 < len(self.segments) else self.index("end-1c")
+        return start, end
+
+    def show_segments(self, segments, reset = False):
+        """Shows the segments, replacing only the ranges that changed when the elements are the same as before."""
+        if reset or [key for key, _ in segments] != [key for key, _ in self.segments]:
+            self.reload(segments, reset)
+            return
+
+        self.config(state=tk.NORMAL)
+        for position, ((_, text), (_, old_text)) in enumerate(zip(segments, self.segments)):
+            if text != old_text:
+                self.replace_segment(position, old_text, text)
+        self.config(state=tk.DISABLED)
+        self.segments = list(segments)
+
+    def reload(self, segments, reset):
+        top = self.yview()[0]
+
+        self.config(state=tk.NORMAL)
+        for position in range(len(self.segments)):
+            self.mark_unset(self.mark_name(position))
+        self.delete("1.0", tk.END)
+
+        for position, (_, text) in enumerate(segments):
+            self.mark_set(self.mark_name(position), "end-1c")
+            self.mark_gravity(self.mark_name(position), tk.LEFT)
+            self.insert("end-1c", text)
+        self.config(state=tk.DISABLED)
+
+        self.segments = list(segments)
+        self.positions = {key: position for position, (key, _) in enumerate(segments)}
+
+        # structural edits keep the reading position, a new page starts at the top
+        self.yview_moveto(0 if reset else top)
+
+    def replace_segment(self, position, old_text, text):
+        # only the part between the common prefix and suffix is touched, a streamed translation only appends
+        prefix = 0
+        limit = min(len(old_text), len(text))
+        while prefix < limit and old_text[prefix] == text[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_text[-1 - suffix] == text[-1 - suffix]:
+            suffix += 1
+
+        start, _ = self.segment_range(position)
+        self.delete(f"{start}+{prefix}c", f"{start}+{len(old_text) - suffix}c")
+        self.insert(f"{start}+{prefix}c", text[prefix:len(text) - suffix])
+
+        # the next segment's mark stays put when the change touches the boundary, so it is placed again
+        self.mark_set(self.mark_name(position), start)
+        if position + 1 < len(self.segments):
+            self.mark_set(self.mark_name(position + 1), f"{start}+{len(text)}c")
+
+    def highlight(self, key):
+        """Highlights the text of an element and scrolls to it, does nothing if it has no text on the page."""
+        self.tag_remove("highlight", "1.0", tk.END)
+        position = self.positions.get(key)
+        if position is None:
+            return
+        start, end = self.segment_range(position)
+        self.tag_add("highlight", start, end)
+        self.see(end)
+        self.see(start)
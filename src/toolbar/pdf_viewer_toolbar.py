@@ -18,6 +18,12 @@ class PdfViewerToolbar(tk.Frame):
         self.export_button = tk.Button(self, text="Export", command=lambda: self.export())
         self.export_button.pack(side='right', padx=2, pady=2)
 
+        # translate
+        self.translate_all_button = tk.Button(self, text="Translate All", command=lambda: self.translate_all())
+        self.translate_all_button.pack(side='right', padx=2, pady=2)
+        self.translate_page_button = tk.Button(self, text="Translate Page", command=lambda: self.translate_page())
+        self.translate_page_button.pack(side='right', padx=2, pady=2)
+
         # Enum 항목을 리스트로 만듭니다.
         self.items = list(PdfViewerToolbarItem)
 
@@ -50,4 +56,10 @@ class PdfViewerToolbar(tk.Frame):
         return self.current_selection
     
     def export(self):
-        self.event_generate("<<ExportButtonClicked>>", when="tail")
\ No newline at end of file
+        self.event_generate("<<ExportButtonClicked>>", when="tail")
+
+    def translate_page(self):
+        self.event_generate("<<TranslatePageButtonClicked>>", when="tail")
+
+    def translate_all(self):
+        self.event_generate("<<TranslateAllButtonClicked>>", when="tail")
\ No newline at end of file